@@ -8,9 +8,16 @@ import math
 from datetime import datetime, timedelta, date, time
 import requests
 import json
+import io
+import os
+import sqlite3
+import threading
+import time as time_mod
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import pytz
 import numpy as np
 from fpdf import FPDF
+import sky_index
 
 # =========================
 # PAGE / CSS
@@ -45,7 +52,10 @@ if "GOOGLE_API_KEY" not in st.secrets:
     st.error("🚨 st.secrets içinde GOOGLE_API_KEY yok. Streamlit Secrets'e ekleyin.")
     st.stop()
 API_KEY = st.secrets["GOOGLE_API_KEY"]
-GEN_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+# ortam değişkenleri: yük testinde yerel sahte sunuculara yönlendirmek için (loadtest.py)
+GEN_API_BASE = os.environ.get("ASTRO_GEN_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+NOMINATIM_URL = os.environ.get("ASTRO_NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+STAGE_LOG_PATH = os.environ.get("ASTRO_STAGE_LOG")   # doluysa her analizde aşama süreleri JSON satırı olarak eklenir
 
 # =========================
 # CONSTANTS
@@ -147,6 +157,19 @@ def sign_symbol(deg): return ZODIAC_SYMBOLS[int(deg/30) % 12]
 def get_element(sign): return ELEMENT.get(sign, "-")
 def get_quality(sign): return QUALITY.get(sign, "-")
 
+def mark_stage(stage_times, name):
+    # submit akışındaki aşama süreleri (loadtest.py, STAGE_LOG_PATH üzerinden okur)
+    now = time_mod.perf_counter()
+    stage_times[name] = now - stage_times.get("_t", now)
+    stage_times["_t"] = now
+
+def write_stage_log(stage_times):
+    if not STAGE_LOG_PATH:
+        return
+    line = json.dumps({k: v for k, v in stage_times.items() if k != "_t"}) + "\n"
+    with open(STAGE_LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(line)
+
 def clean_text_for_pdf(text: str) -> str:
     replacements = {
         'ğ':'g','Ğ':'G','ş':'s','Ş':'S','ı':'i','İ':'I','ü':'u','Ü':'U','ö':'o','Ö':'O','ç':'c','Ç':'C',
@@ -162,7 +185,7 @@ def clean_text_for_pdf(text: str) -> str:
 def city_to_latlon(city: str):
     try:
         r = requests.get(
-            "https://nominatim.openstreetmap.org/search",
+            NOMINATIM_URL,
             params={"q": city, "format":"json", "limit": 1},
             headers={"User-Agent":"astro-natal-transit"},
             timeout=15
@@ -174,6 +197,130 @@ def city_to_latlon(city: str):
         pass
     return None, None
 
+# =========================
+# RESULT TYPES (__slots__; metin sadece gösterimde üretilir)
+# =========================
+class Placement:
+    __slots__ = ("planet", "sign", "deg", "house")
+
+    def __init__(self, planet, sign, deg, house):
+        self.planet = planet
+        self.sign = sign
+        self.deg = deg
+        self.house = house
+
+    @property
+    def symbol(self):
+        return PLANET_SYMBOLS.get(self.planet, "")
+
+class Aspect:
+    __slots__ = ("p1", "aspect", "p2", "angle")
+
+    def __init__(self, p1, aspect, p2, angle):
+        self.p1 = p1
+        self.aspect = aspect
+        self.p2 = p2
+        self.angle = angle
+
+    def __str__(self):
+        return f"{self.p1} {self.aspect} {self.p2} ({round(self.angle,1)}°)"
+
+class TransitHit:
+    __slots__ = ("score", "when", "transit", "aspect", "natal", "house")
+
+    def __init__(self, score, when, transit, aspect, natal, house):
+        self.score = score
+        self.when = when
+        self.transit = transit
+        self.aspect = aspect
+        self.natal = natal
+        self.house = house
+
+    @property
+    def key(self):
+        # tekilleştirme anahtarı (skor transit+açıdan türediği için dahil değil)
+        return (self.when, self.transit, self.aspect, self.natal, self.house)
+
+    @property
+    def sort_key(self):
+        # eski "(skor, metin)" sıralamasının birebir karşılığı
+        return (self.score, self.when, self.transit, self.aspect, self.natal)
+
+    def __str__(self):
+        topic = HOUSE_TOPICS.get(self.house, "Genel")
+        return f"⚠️ {self.when}: Transit {self.transit} {self.aspect} natal {self.natal} → {topic} (güç:{self.score})"
+
+class TimelineEvent:
+    __slots__ = ("age", "method", "planet", "kind", "target", "value")
+
+    def __init__(self, age, method, planet, kind, target=None, value=None):
+        self.age = age
+        self.method = method     # "İkincil" / "Solar ark"
+        self.planet = planet
+        self.kind = kind         # "aspect" / "sign" / "house"
+        self.target = target     # natal nokta (aspect için)
+        self.value = value       # açı adı / burç / ev no
+
+    def __str__(self):
+        head = f"{self.age:.1f} yaş | {self.method} {self.planet}"
+        if self.kind == "aspect":
+            return f"{head} {self.value} natal {self.target}"
+        if self.kind == "sign":
+            return f"{head} → {self.value}"
+        return f"{head} → {self.value}. ev ({HOUSE_TOPICS.get(self.value)})"
+
+class ReturnChart:
+    __slots__ = ("planet", "utc", "chart")
+
+    def __init__(self, planet, utc, chart):
+        self.planet = planet
+        self.utc = utc
+        self.chart = chart       # NatalResult (dönüş anı + seçilen konum)
+
+class CohortGroup:
+    __slots__ = ("key", "n", "matrix_mean", "dom_elem_hist", "dom_qual_hist")
+
+    def __init__(self, key, n, matrix_mean, dom_elem_hist, dom_qual_hist):
+        self.key = key                     # gruplama kolonlarının değerleri (tuple)
+        self.n = n
+        self.matrix_mean = matrix_mean     # (3, 4) nitelik x element ortalama puan
+        self.dom_elem_hist = dom_elem_hist # {element: adet} ("-" = puansız)
+        self.dom_qual_hist = dom_qual_hist
+
+class RectificationCandidate:
+    __slots__ = ("local_dt", "utc", "score", "asc", "mc")
+
+    def __init__(self, local_dt, utc, score, asc, mc):
+        self.local_dt = local_dt
+        self.utc = utc
+        self.score = score
+        self.asc = asc
+        self.mc = mc
+
+class ElectionWindow:
+    __slots__ = ("start", "end", "score", "best", "notes")
+
+    def __init__(self, start, end, score, best, notes):
+        self.start = start
+        self.end = end
+        self.score = score
+        self.best = best
+        self.notes = notes
+
+    @property
+    def minutes(self):
+        return int((self.end - self.start).total_seconds() // 60)
+
+class NatalResult:
+    __slots__ = ("cusps", "placements", "aspects", "elem_count", "qual_count")
+
+    def __init__(self, cusps, placements, aspects, elem_count, qual_count):
+        self.cusps = cusps
+        self.placements = placements
+        self.aspects = aspects
+        self.elem_count = elem_count
+        self.qual_count = qual_count
+
 # =========================
 # GEMINI (model list + pick 2.5)
 # =========================
@@ -206,17 +353,116 @@ def pick_default_model(models):
             return p
     return models[0] if models else "models/gemini-2.5-flash"
 
-def gemini_generate(prompt: str, model_fullname: str) -> str:
+def pick_hedge_model(models, primary):
+    # hedge için hızlı yedek model (primary'den farklı olmalı)
+    preferred = [
+        "models/gemini-2.5-flash-lite",
+        "models/gemini-2.0-flash",
+        "models/gemini-2.5-flash",
+        "models/gemini-1.5-flash",
+    ]
+    for p in preferred:
+        if p in models and p != primary:
+            return p
+    return None
+
+def gemini_generate(prompt: str, model_fullname: str, timeout=80, latency_store=None) -> str:
     url = f"{GEN_API_BASE}/{model_fullname}:generateContent?key={API_KEY}"
     payload = {"contents":[{"parts":[{"text":prompt}]}]}
-    resp = requests.post(url, headers={"Content-Type":"application/json"}, data=json.dumps(payload), timeout=80)
+    t0 = time_mod.monotonic()
+    resp = requests.post(url, headers={"Content-Type":"application/json"}, data=json.dumps(payload), timeout=timeout)
     if resp.status_code != 200:
         return f"AI Servis Hatası: HTTP {resp.status_code}\n{resp.text[:800]}"
+    if latency_store is not None:
+        record_latency(latency_store, model_fullname, time_mod.monotonic() - t0)
     js = resp.json()
     if js.get("candidates"):
         return js["candidates"][0]["content"]["parts"][0]["text"]
     return "AI yanıtı boş döndü."
 
+# =========================
+# GEMINI HEDGE (model bazlı gecikme histogramı + süre sınırı)
+# =========================
+# histogram kova üst sınırları (saniye); son kova = timeout
+LATENCY_BUCKETS = [0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60, 80]
+HEDGE_DEFAULT_DELAY = 8.0   # yeterli örnek yokken
+HEDGE_MIN_SAMPLES = 5
+
+@st.cache_resource
+def get_latency_store():
+    # tüm oturumlar ortak kullanır -> lock şart
+    return {"lock": threading.Lock(), "hist": {}}
+
+def record_latency(store, model, seconds):
+    idx = len(LATENCY_BUCKETS) - 1
+    for i, ub in enumerate(LATENCY_BUCKETS):
+        if seconds <= ub:
+            idx = i
+            break
+    with store["lock"]:
+        counts = store["hist"].setdefault(model, [0]*len(LATENCY_BUCKETS))
+        counts[idx] += 1
+
+def latency_percentile(store, model, pct, default=HEDGE_DEFAULT_DELAY):
+    with store["lock"]:
+        counts = list(store["hist"].get(model, []))
+    n = sum(counts)
+    if n < HEDGE_MIN_SAMPLES:
+        return default
+    target = n * pct / 100.0
+    cum = 0
+    for ub, c in zip(LATENCY_BUCKETS, counts):
+        cum += c
+        if cum >= target:
+            return float(ub)
+    return float(LATENCY_BUCKETS[-1])
+
+def _is_ai_error(text):
+    return text.startswith("AI Servis Hatası") or text == "AI yanıtı boş döndü."
+
+def _safe_generate(prompt, model_fullname, timeout, latency_store):
+    try:
+        return gemini_generate(prompt, model_fullname, timeout=timeout, latency_store=latency_store)
+    except Exception as e:
+        return f"AI Servis Hatası: {model_fullname} {type(e).__name__}: {str(e)[:300]}"
+
+def gemini_generate_hedged(prompt, primary, fallback, latency_store, hedge_pct=90, deadline_s=45):
+    """
+    primary, kendi gecikme histogramının hedge_pct yüzdeliği içinde cevap vermezse
+    (ya da hata dönerse) aynı prompt fallback modele de gönderilir; ilk başarılı cevap alınır.
+    deadline_s dolarsa "AI Servis Hatası" döner -> çağıran taraf kural tabanlı rapora düşer.
+    """
+    t_end = time_mod.monotonic() + deadline_s
+    ex = ThreadPoolExecutor(max_workers=2)
+    try:
+        pending = {ex.submit(_safe_generate, prompt, primary, deadline_s, latency_store)}
+        hedge_at = time_mod.monotonic() + latency_percentile(latency_store, primary, hedge_pct)
+        hedged = not fallback or fallback == primary
+        last_err = "AI Servis Hatası: yanıt alınamadı."
+
+        while pending:
+            now = time_mod.monotonic()
+            if now >= t_end:
+                break
+            wait_until = t_end if hedged else min(hedge_at, t_end)
+            done, pending = wait(pending, timeout=max(0.0, wait_until - now), return_when=FIRST_COMPLETED)
+            for f in done:
+                text = f.result()
+                if not _is_ai_error(text):
+                    return text
+                last_err = text
+            if not hedged and (time_mod.monotonic() >= hedge_at or not pending):
+                remaining = t_end - time_mod.monotonic()
+                pending.add(ex.submit(_safe_generate, prompt, fallback, max(1.0, remaining), latency_store))
+                hedged = True
+
+        if pending:
+            return f"AI Servis Hatası: {deadline_s} sn süre sınırı aşıldı."
+        return last_err
+    finally:
+        # yavaş kalan istek arka planda biter; kullanıcıyı bekletmeyiz
+        ex.shutdown(wait=False, cancel_futures=True)
+
 # =========================
 # PLACIDUS-LIKE CUSPS + HOUSE FINDER
 # =========================
@@ -276,6 +522,39 @@ def get_house_of_deg(deg, cusps):
                 return i
     return 1
 
+def placidus_cusps_vec(ramc_deg, lat):
+    """
+    calculate_placidus_cusps'un vektör hali (aynı formüller).
+    ramc_deg: (N,) yerel yıldız zamanı (derece), lat: skaler veya (N,)
+    -> (N, 12) cusp dizisi (sütun 0 = 1. ev).
+    """
+    ramc_deg = np.asarray(ramc_deg, dtype=float) % 360
+    ramc = np.radians(ramc_deg)
+    eps = math.radians(23.44)
+    lat_rad = np.radians(lat)
+
+    mc = np.degrees(np.arctan2(np.tan(ramc), math.cos(eps))) % 360
+    same_half = (np.abs(mc - ramc_deg) <= 90) | (np.abs(mc - ramc_deg - 360) <= 90)
+    mc = np.where(same_half, mc, (mc + 180) % 360)
+    ic = (mc + 180) % 360
+
+    asc = np.degrees(np.arctan2(
+        np.cos(ramc),
+        -(np.sin(ramc)*math.cos(eps) + np.tan(lat_rad)*math.sin(eps))
+    )) % 360
+    dsc = (asc + 180) % 360
+
+    diff = (asc - mc) % 360
+    c11 = (mc + diff/3) % 360
+    c12 = (mc + 2*diff/3) % 360
+    diff2 = (ic - asc) % 360
+    c2 = (asc + diff2/3) % 360
+    c3 = (asc + 2*diff2/3) % 360
+    return np.stack([
+        asc, c2, c3, ic, (c11 + 180) % 360, (c12 + 180) % 360,
+        dsc, (c2 + 180) % 360, (c3 + 180) % 360, mc, c11, c12
+    ], axis=1)
+
 # =========================
 # ELEMENT/NITELIK PUANLAMA (senin kuralın)
 # =========================
@@ -303,7 +582,7 @@ def build_points_config(include_outer_as_1: bool):
 
 def compute_element_quality_scored(placements, points_cfg):
     """
-    placements: [{'planet','sign','deg','house'}, ...]  ASC/MC dahil
+    placements: [Placement, ...]  ASC/MC dahil
     çıktı:
       elem_scores dict, qual_scores dict,
       matrix (quality->element->score),
@@ -318,8 +597,8 @@ def compute_element_quality_scored(placements, points_cfg):
     total = 0
 
     for p in placements:
-        planet = p["planet"]
-        sign = p["sign"]
+        planet = p.planet
+        sign = p.sign
         w = points_cfg.get(planet, 0)
         if w <= 0:
             continue
@@ -372,14 +651,9 @@ def compute_natal(utc_dt, lat, lon):
     asc_sign = sign_name(cusps[1])
     mc_sign  = sign_name(cusps[10])
 
-    visual_data = [
-        ("ASC", asc_sign, cusps[1], "ASC"),
-        ("MC",  mc_sign,  cusps[10], "MC"),
-    ]
-
     placements = [
-        {"planet":"ASC","sign":asc_sign,"deg":cusps[1],"house":1},
-        {"planet":"MC","sign":mc_sign,"deg":cusps[10],"house":10},
+        Placement("ASC", asc_sign, cusps[1], 1),
+        Placement("MC", mc_sign, cusps[10], 10),
     ]
 
     planet_objs = get_planet_objects()
@@ -388,35 +662,278 @@ def compute_natal(utc_dt, lat, lon):
         deg = normalize(math.degrees(ephem.Ecliptic(body).lon))
         sign = sign_name(deg)
         house = get_house_of_deg(deg, cusps)
-        visual_data.append((pname, sign, deg, PLANET_SYMBOLS.get(pname,"")))
-        placements.append({"planet":pname,"sign":sign,"deg":deg,"house":house})
+        placements.append(Placement(pname, sign, deg, house))
 
-    aspects_str = []
-    aspects_raw = []
-    p_list = [x for x in visual_data if x[0] not in ("ASC","MC")]
+    aspects = []
+    p_list = [x for x in placements if x.planet not in ("ASC","MC")]
     for i in range(len(p_list)):
         for j in range(i+1, len(p_list)):
-            n1, _, d1, _ = p_list[i]
-            n2, _, d2, _ = p_list[j]
-            dd = angle_diff(d1, d2)
+            a, b = p_list[i], p_list[j]
+            dd = angle_diff(a.deg, b.deg)
             for asp, ang in ASPECT_ANGLES.items():
                 if abs(dd - ang) <= ASPECT_ORBS.get(asp, 8):
-                    aspects_str.append(f"{n1} {asp} {n2} ({round(dd,1)}°)")
-                    aspects_raw.append((n1, asp, n2, dd))
+                    aspects.append(Aspect(a.planet, asp, b.planet, dd))
                     break
 
+    elem_count, qual_count = count_elements_qualities(placements)
+    return NatalResult(cusps, placements, aspects, elem_count, qual_count)
+
+def count_elements_qualities(placements):
     # (eski sayım bazlı) -> ayrı tutuyoruz ama özet artık PUANLI kullanacak
     elem_count = {"Ateş":0,"Toprak":0,"Hava":0,"Su":0}
     qual_count = {"Öncü":0,"Sabit":0,"Değişken":0}
     for p in placements:
-        if p["planet"] in ("ASC","MC"):
+        if p.planet in ("ASC","MC"):
             continue
-        e = get_element(p["sign"])
-        q = get_quality(p["sign"])
+        e = get_element(p.sign)
+        q = get_quality(p.sign)
         if e in elem_count: elem_count[e]+=1
         if q in qual_count: qual_count[q]+=1
+    return elem_count, qual_count
+
+# =========================
+# CHART STORE (SQLite, yerel dosya)
+# =========================
+CHART_DB_PATH = os.environ.get(
+    "ASTRO_CHART_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "astro_charts.sqlite")
+)
+
+# compute_natal / calculate_placidus_cusps / ASPECT_ORBS / ev kuralı değişirse artırın:
+# eski sürümün kayıtları okunmaz, sorgulara girmez; harita yeniden hesaplanıp yeni anahtarla yazılır.
+CHART_ALGO_VERSION = 1
+
+CHART_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS charts (
+    id INTEGER PRIMARY KEY,
+    chart_key TEXT NOT NULL UNIQUE,
+    algo_version INTEGER NOT NULL DEFAULT 0,
+    utc TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    asc_sign TEXT NOT NULL,
+    dom_elem TEXT NOT NULL,
+    dom_qual TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS placements (
+    chart_id INTEGER NOT NULL REFERENCES charts(id) ON DELETE CASCADE,
+    planet TEXT NOT NULL,
+    sign TEXT NOT NULL,
+    house INTEGER NOT NULL,
+    deg REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_placements_psh ON placements(planet, sign, house, chart_id);
+CREATE INDEX IF NOT EXISTS ix_placements_ph ON placements(planet, house, chart_id);
+CREATE INDEX IF NOT EXISTS ix_charts_asc ON charts(asc_sign);
+CREATE INDEX IF NOT EXISTS ix_charts_dom ON charts(dom_elem, dom_qual);
+"""
+
+@st.cache_resource
+def get_chart_store(path=CHART_DB_PATH):
+    # tüm oturumlar tek bağlantıyı paylaşır -> lock şart
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(CHART_DB_SCHEMA)
+    # sürüm kolonundan önceki dosyalar: kolon eklenir, eski satırlar 0 (= geçersiz) kalır
+    if "algo_version" not in [r[1] for r in conn.execute("PRAGMA table_info(charts)")]:
+        conn.execute("ALTER TABLE charts ADD COLUMN algo_version INTEGER NOT NULL DEFAULT 0")
+    return {"lock": threading.Lock(), "conn": conn}
+
+def chart_key(utc_dt, lat, lon):
+    # dakika + ~10 m hassasiyet: aynı form girişi -> aynı anahtar (algoritma sürümü dahil)
+    return f"v{CHART_ALGO_VERSION}|{utc_dt.strftime('%Y-%m-%dT%H:%M')}|{round(lat, 4):.4f}|{round(lon, 4):.4f}"
+
+def _natal_to_payload(natal):
+    return json.dumps({
+        "cusps": natal.cusps,
+        "placements": [[p.planet, p.sign, p.deg, p.house] for p in natal.placements],
+        "aspects": [[a.p1, a.aspect, a.p2, a.angle] for a in natal.aspects],
+        "elem_count": natal.elem_count,
+        "qual_count": natal.qual_count,
+    }, ensure_ascii=False)
+
+def _natal_from_payload(payload):
+    js = json.loads(payload)
+    return NatalResult(
+        {int(k): v for k, v in js["cusps"].items()},
+        [Placement(*x) for x in js["placements"]],
+        [Aspect(*x) for x in js["aspects"]],
+        js["elem_count"],
+        js["qual_count"],
+    )
+
+def load_chart(store, key):
+    with store["lock"]:
+        row = store["conn"].execute(
+            "SELECT payload FROM charts WHERE chart_key = ? AND algo_version = ?", (key, CHART_ALGO_VERSION)
+        ).fetchone()
+    return _natal_from_payload(row[0]) if row else None
+
+def save_chart(store, key, utc_dt, lat, lon, natal):
+    # baskınlık indeksi varsayılan puan kuralıyla (dış gezegenler 0)
+    _, _, _, _, dom_elem, dom_qual = compute_element_quality_scored(natal.placements, build_points_config(False))
+    asc_sign = sign_name(natal.cusps[1])
+    with store["lock"]:
+        conn = store["conn"]
+        with conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO charts (chart_key, algo_version, utc, lat, lon, asc_sign, dom_elem, dom_qual, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, CHART_ALGO_VERSION, utc_dt.strftime("%Y-%m-%d %H:%M:%S"), lat, lon, asc_sign, dom_elem, dom_qual,
+                 _natal_to_payload(natal))
+            )
+            if cur.rowcount:
+                conn.executemany(
+                    "INSERT INTO placements (chart_id, planet, sign, house, deg) VALUES (?, ?, ?, ?, ?)",
+                    [(cur.lastrowid, p.planet, p.sign, p.house, p.deg) for p in natal.placements]
+                )
+
+def get_or_compute_natal(store, utc_dt, lat, lon):
+    """Tekrar gelen harita kayıttan okunur; yoksa hesaplanıp kaydedilir. (natal, kayıttan_mı)"""
+    key = chart_key(utc_dt, lat, lon)
+    natal = load_chart(store, key)
+    if natal is not None:
+        return natal, True
+    natal = compute_natal(utc_dt, lat, lon)
+    save_chart(store, key, utc_dt, lat, lon, natal)
+    return natal, False
+
+def query_charts(store, placements=(), asc_sign=None, dom_elem=None, dom_qual=None, limit=200):
+    """
+    placements: [(gezegen, burç|None, ev|None), ...]  hepsi AND
+    örn. query_charts(store, [("Güneş","Akrep",10)])
+    Dönüş: [(chart_key, utc, lat, lon, asc_sign, dom_elem, dom_qual), ...]
+    """
+    sql = "SELECT c.chart_key, c.utc, c.lat, c.lon, c.asc_sign, c.dom_elem, c.dom_qual FROM charts c"
+    where, args = [], []
+    for i, (planet, sign, house) in enumerate(placements):
+        sql += f" JOIN placements p{i} ON p{i}.chart_id = c.id AND p{i}.planet = ?"
+        args.append(planet)
+        if sign is not None:
+            sql += f" AND p{i}.sign = ?"
+            args.append(sign)
+        if house is not None:
+            sql += f" AND p{i}.house = ?"
+            args.append(int(house))
+    for col, val in (("asc_sign", asc_sign), ("dom_elem", dom_elem), ("dom_qual", dom_qual)):
+        if val is not None:
+            where.append(f"c.{col} = ?")
+            args.append(val)
+    where.append("c.algo_version = ?")
+    args.append(CHART_ALGO_VERSION)
+    sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY c.id LIMIT ?"
+    args.append(int(limit))
+    with store["lock"]:
+        return store["conn"].execute(sql, args).fetchall()
+
+# =========================
+# COHORT ANALYTICS (burç indeksleri + lookup-table vektörizasyonu)
+# =========================
+ELEMENT_ORDER = ["Ateş","Hava","Toprak","Su"]
+QUALITY_ORDER = ["Öncü","Sabit","Değişken"]
+SIGN_ELEM_IDX = np.array([ELEMENT_ORDER.index(ELEMENT[z]) for z in ZODIAC])
+SIGN_QUAL_IDX = np.array([QUALITY_ORDER.index(QUALITY[z]) for z in ZODIAC])
+SIGN_CELL_IDX = SIGN_QUAL_IDX * len(ELEMENT_ORDER) + SIGN_ELEM_IDX   # burç -> matris hücresi
+COHORT_POINTS = ["ASC","MC"] + list(PLANET_MEANING.keys())
+N_CELLS = len(QUALITY_ORDER) * len(ELEMENT_ORDER)
+
+def score_population(sign_idx, points_cfg, points=COHORT_POINTS):
+    """
+    compute_element_quality_scored'un popülasyon hali.
+    sign_idx: (N, len(points)) int burç indeksleri (0=Koç .. 11=Balık)
+    Dönüş: matrix (N,3,4), elem (N,4), qual (N,3), total (N,), dom_elem (N,), dom_qual (N,)
+    dom_* = ELEMENT_ORDER/QUALITY_ORDER indeksi, puansız haritada -1.
+    """
+    sign_idx = np.asarray(sign_idx)
+    n = sign_idx.shape[0]
+    w = np.array([points_cfg.get(p, 0) for p in points], dtype=float)
+    keep = w > 0
+    cells = SIGN_CELL_IDX[sign_idx[:, keep]]
+    flat = (np.arange(n)[:, None] * N_CELLS + cells).ravel()
+    weights = np.broadcast_to(w[keep], cells.shape).ravel()
+    matrix = np.bincount(flat, weights=weights, minlength=n * N_CELLS).reshape(n, len(QUALITY_ORDER), len(ELEMENT_ORDER))
+
+    elem = matrix.sum(axis=1)
+    qual = matrix.sum(axis=2)
+    total = elem.sum(axis=1)
+    # argmax ilk maksimumu seçer -> tek harita fonksiyonundaki max() ile aynı eşitlik kuralı
+    dom_elem = np.where(total > 0, elem.argmax(axis=1), -1)
+    dom_qual = np.where(total > 0, qual.argmax(axis=1), -1)
+    return matrix, elem, qual, total, dom_elem, dom_qual
+
+def _group_ids(group_cols, n):
+    if not group_cols:
+        return np.zeros(n, dtype=np.int64), [()]
+    uniques, invs = [], []
+    for col in group_cols.values():
+        u, inv = np.unique(np.asarray(col), return_inverse=True)
+        uniques.append(u)
+        invs.append(inv.ravel())
+    code = np.ravel_multi_index(invs, [len(u) for u in uniques])
+    codes, gid = np.unique(code, return_inverse=True)
+    parts = np.unravel_index(codes, [len(u) for u in uniques])
+    keys = [tuple(u[i].item() for u, i in zip(uniques, idx)) for idx in zip(*parts)]
+    return gid.ravel(), keys
+
+def cohort_aggregate(sign_idx, points_cfg, group_cols=None):
+    """
+    Popülasyonu skorlar ve gruplara göre toplar.
+    group_cols: {kolon_adı: (N,) dizi} -> örn. {"onyıl": yıllar // 10 * 10}
+    Dönüş: gruba göre sıralı CohortGroup listesi.
+    """
+    matrix, _, _, _, dom_elem, dom_qual = score_population(sign_idx, points_cfg)
+    n = matrix.shape[0]
+    gid, keys = _group_ids(group_cols, n)
+    g = len(keys)
+
+    counts = np.bincount(gid, minlength=g)
+    flat = matrix.reshape(n, N_CELLS)
+    sums = np.stack([np.bincount(gid, weights=flat[:, c], minlength=g) for c in range(N_CELLS)], axis=1)
+    means = (sums / np.maximum(counts, 1)[:, None]).reshape(g, len(QUALITY_ORDER), len(ELEMENT_ORDER))
+
+    ne, nq = len(ELEMENT_ORDER) + 1, len(QUALITY_ORDER) + 1
+    e_hist = np.bincount(gid * ne + dom_elem + 1, minlength=g * ne).reshape(g, ne)
+    q_hist = np.bincount(gid * nq + dom_qual + 1, minlength=g * nq).reshape(g, nq)
+    e_labels = ["-"] + ELEMENT_ORDER
+    q_labels = ["-"] + QUALITY_ORDER
+
+    return [
+        CohortGroup(
+            keys[i], int(counts[i]), means[i],
+            {lbl: int(c) for lbl, c in zip(e_labels, e_hist[i])},
+            {lbl: int(c) for lbl, c in zip(q_labels, q_hist[i])},
+        )
+        for i in range(g)
+    ]
 
-    return cusps, visual_data, placements, aspects_str, aspects_raw, elem_count, qual_count
+def cohort_from_store(store):
+    """Arşivdeki tüm haritalar -> (sign_idx (N,P), {"onyıl", "asc_sign"} kolonları)."""
+    with store["lock"]:
+        conn = store["conn"]
+        charts = conn.execute(
+            "SELECT id, utc, asc_sign FROM charts WHERE algo_version = ? ORDER BY id", (CHART_ALGO_VERSION,)
+        ).fetchall()
+        rows = conn.execute(
+            "SELECT p.chart_id, p.planet, p.sign FROM placements p JOIN charts c ON c.id = p.chart_id "
+            "WHERE c.algo_version = ?", (CHART_ALGO_VERSION,)
+        ).fetchall()
+    if not charts:
+        return np.zeros((0, len(COHORT_POINTS)), dtype=np.int64), {}
+    row_of = {cid: i for i, (cid, _, _) in enumerate(charts)}
+    col_of = {p: j for j, p in enumerate(COHORT_POINTS)}
+    sign_of = {z: i for i, z in enumerate(ZODIAC)}
+    sign_idx = np.zeros((len(charts), len(COHORT_POINTS)), dtype=np.int64)
+    for cid, planet, sign in rows:
+        sign_idx[row_of[cid], col_of[planet]] = sign_of[sign]
+    years = np.array([int(u[:4]) for _, u, _ in charts])
+    cols = {
+        "onyıl": years // 10 * 10,
+        "asc_sign": np.array([a for _, _, a in charts]),
+    }
+    return sign_idx, cols
 
 # =========================
 # TRANSITS (range) + natal hits + house themes
@@ -431,7 +948,7 @@ def compute_transits(natal_placements, natal_cusps, lat, lon, tr_start_utc, tr_e
     obs.lat, obs.lon = str(lat), str(lon)
     tr_mid_utc = tr_start_utc + (tr_end_utc - tr_start_utc)/2
 
-    natal_map = {p["planet"]: p for p in natal_placements if p["planet"] not in ("ASC","MC")}
+    natal_map = {p.planet: p for p in natal_placements if p.planet not in ("ASC","MC")}
 
     movement = []
     house_themes = []
@@ -455,9 +972,8 @@ def compute_transits(natal_placements, natal_cusps, lat, lon, tr_start_utc, tr_e
 
         checks = [(d1,"başlangıç"),(d2,"orta"),(d3,"bitiş")]
         for np_name, np in natal_map.items():
-            nd = np["deg"]
-            nh = np["house"]
-            topic = HOUSE_TOPICS.get(nh,"Genel")
+            nd = np.deg
+            nh = np.house
 
             for dcheck, when in checks:
                 delta = angle_diff(dcheck, nd)
@@ -472,20 +988,706 @@ def compute_transits(natal_placements, natal_cusps, lat, lon, tr_start_utc, tr_e
                         elif asp == "Kare": score += 2
                         else: score += 1
 
-                        hits.append((score, f"⚠️ {when}: Transit {tname} {asp} natal {np_name} → {topic} (güç:{score})"))
+                        hits.append(TransitHit(score, when, tname, asp, np_name, nh))
 
     uniq = {}
-    for s,t in hits:
-        if t not in uniq or s > uniq[t]:
-            uniq[t] = s
-    hits_sorted = sorted([(s,t) for t,s in uniq.items()], reverse=True)
+    for h in hits:
+        k = h.key
+        if k not in uniq or h.score > uniq[k].score:
+            uniq[k] = h
+    hits_sorted = sorted(uniq.values(), key=lambda h: h.sort_key, reverse=True)
 
     return movement, house_themes, hits_sorted
 
+# =========================
+# SKY CONTEXT (önceden hesaplanmış olay indeksi; istek anında efemeris yok)
+# =========================
+SKY_CONTEXT_BODIES = [name for name, _ in HEAVY_TRANSITS]
+
+@st.cache_resource
+def _load_sky_index_shared():
+    index = sky_index.load_sky_index()
+    if index is None:
+        raise FileNotFoundError(sky_index.SKY_INDEX_PATH)   # istisnalar önbelleğe alınmaz
+    return index
+
+def get_sky_index():
+    """Yüklenen indeks oturumlar arasında paylaşılır; dosya yoksa None önbelleğe girmez, sonraki çalıştırmada yeniden bakılır."""
+    try:
+        return _load_sky_index_shared()
+    except (OSError, ValueError):
+        return None
+
+def sky_context_lines(index, start_utc, end_utc):
+    """Transit penceresi için: ağır gezegen açı/giriş/istasyonları, lunasyonlar, Merkür retroları."""
+    ev = sky_index.query_events(
+        index, start_utc, end_utc,
+        kinds=[sky_index.EV_ASPECT, sky_index.EV_INGRESS, sky_index.EV_STATION_R, sky_index.EV_STATION_D,
+               sky_index.EV_NEW_MOON, sky_index.EV_FULL_MOON],
+        bodies=SKY_CONTEXT_BODIES,
+    )
+    lines = [sky_index.format_event(e) for e in ev]
+    for r, d in sky_index.retrograde_periods(index, "Merkür", start_utc, end_utc):
+        lines.append(f"{r.strftime('%Y-%m-%d')} → {d.strftime('%Y-%m-%d')} | Merkür retro")
+    return sorted(lines)
+
+# =========================
+# PROGRESSIONS (ikincil progresyon + solar ark, tek efemeris geçişi)
+# =========================
+PROGRESSION_ORB = 1.0
+
+def houses_of_degs(degs, cusps):
+    """get_house_of_deg'in vektör hali (aynı [başlangıç, bitiş) kuralı)."""
+    c1 = cusps[1]
+    offs = np.array([(cusps[i] - c1) % 360 for i in range(1, 13)])
+    rel = (np.asarray(degs, dtype=float) - c1) % 360
+    return np.searchsorted(offs, rel, side="right")
+
+def houses_of_degs_rows(degs, cusps):
+    """houses_of_degs'in satır başına farklı cusp'lı hali: degs (N,), cusps (N, 12)."""
+    offs = (cusps - cusps[:, :1]) % 360
+    rel = (degs - cusps[:, 0]) % 360
+    return (offs <= rel[:, None]).sum(axis=1)
+
+def ecliptic_lon(a_ra, a_dec, epoch):
+    """
+    math.degrees(ephem.Ecliptic(body).lon) % 360 ile aynı sonuç (libastro ortalama eğiklik,
+    tarih ekinoksu), dizi üzerinde ve Ecliptic nesnesi üretmeden. epoch: ephem.Date günü.
+    """
+    t = (np.asarray(epoch, dtype=float) - 36525.0) / 36525.0
+    eps = np.radians(23.4392911 + t*(-46.8150 + t*(-0.00059 + t*0.001813)) / 3600.0)
+    return np.degrees(np.arctan2(np.sin(a_ra)*np.cos(eps) + np.tan(a_dec)*np.sin(eps), np.cos(a_ra))) % 360
+
+def ephemeris_longitudes(utc_dts, lat, lon, names=None):
+    """
+    Tek Observer + tek gövde seti ile (tarih x gezegen) ekliptik boylam matrisi.
+    Sütun sırası get_planet_objects() ile aynı (names verilirse sadece o gezegenler).
+    """
+    obs = ephem.Observer()
+    obs.lat, obs.lon = str(lat), str(lon)
+    bodies = [(n, b) for n, b in get_planet_objects().items() if names is None or n in names]
+    ra = np.empty((len(utc_dts), len(bodies)))
+    dec = np.empty_like(ra)
+    epoch = np.empty((len(utc_dts), 1))
+    for i, dt in enumerate(utc_dts):
+        obs.date = dt.strftime("%Y/%m/%d %H:%M:%S")
+        obs.epoch = obs.date
+        epoch[i] = float(obs.date)
+        for j, (_, body) in enumerate(bodies):
+            body.compute(obs)
+            ra[i, j] = body.a_ra
+            dec[i, j] = body.a_dec
+    return [name for name, _ in bodies], ecliptic_lon(ra, dec, epoch)
+
+def _level_crossings(ages, x, level, period):
+    """
+    x: (yaş, ...) unwrap edilmiş boylamlar. x'in (level + k*period) seviyelerini
+    ardışık örnekler arasında kestiği yaşlar (lineer ara değer, sky_index._crossings gibi).
+    Örnekler arasında seviyenin tamamen atlanması mümkün değil: yıllık adım < period.
+    Dönüş: (yaşlar, ileri_mi, kesişilen seviye, x'in diğer eksenlerindeki indeksler)
+    """
+    k = np.floor((x - level) / period)
+    hit = np.nonzero(k[1:] != k[:-1])
+    i, rest = hit[0], hit[1:]
+    a, b = x[(i,) + rest], x[(i + 1,) + rest]
+    target = level + np.maximum(k[(i,) + rest], k[(i + 1,) + rest]) * period
+    age = ages[i] + (target - a) / (b - a) * (ages[i + 1] - ages[i])
+    return age, b > a, target, rest
+
+def _timeline_events(method, names, pos, natal, orb):
+    """
+    pos: (yıl, nokta) boylamlar. Açının orb'a girişi, burç ve ev değişimleri
+    yıllık örnekler arasındaki kesişim yaşı olarak (ondalıklı) bulunur; progresif Ay
+    yılda ~13° ilerlediği için örneğin orb içine düşmesini beklemek girişleri kaçırır.
+    """
+    natal_names = [p.planet for p in natal.placements]
+    natal_degs = np.array([p.deg for p in natal.placements])
+    ages = np.arange(len(pos), dtype=float)
+    u = np.unwrap(pos, period=360.0, axis=0)   # radyan gidiş-dönüşü yok: cusp üzerindeki solar ark ASC/MC 0. yaşta birebir kalır
+    events = []
+
+    # açı: (progresif - natal) farkı, ±açı merkezli orb penceresinin yaklaşılan kenarını keser
+    rel = u[:, :, None] - natal_degs[None, None, :]
+    for asp, angle in ASPECT_ANGLES.items():
+        for center in {angle % 360, -angle % 360}:
+            for level, forward in ((center - orb, True), (center + orb, False)):
+                age, fwd, _, (p, n) = _level_crossings(ages, rel, level, 360.0)
+                sel = fwd == forward
+                for t, pi, ni in zip(age[sel], p[sel], n[sel]):
+                    if names[pi] == natal_names[ni]:
+                        continue
+                    events.append(TimelineEvent(float(t), method, names[pi], "aspect", natal_names[ni], asp))
+
+    # burç: 30°'nin katları; geri harekette girilen burç bir öncekidir
+    age, fwd, target, (p,) = _level_crossings(ages, u, 0.0, 30.0)
+    sign_idx = np.rint(target / 30).astype(int) - (~fwd)
+    for t, pi, si in zip(age, p, sign_idx):
+        events.append(TimelineEvent(float(t), method, names[pi], "sign", value=ZODIAC[si % 12]))
+
+    # ev: natal cusp'lar (dar evler de atlanmaz)
+    for h in range(1, 13):
+        age, fwd, _, (p,) = _level_crossings(ages, u, natal.cusps[h], 360.0)
+        for t, pi, f in zip(age, p, fwd):
+            events.append(TimelineEvent(float(t), method, names[pi], "house", value=h if f else (h - 2) % 12 + 1))
+    return events
+
+def compute_progressions(natal, utc_dt, lat, lon, years=90, orb=PROGRESSION_ORB):
+    """
+    İkincil progresyon (doğumdan sonraki 1 gün = 1 yıl) ve solar ark direksiyonları.
+    Tüm ömür için efemeris tek geçişte (years+1 gün) hesaplanır; açı/burç/ev
+    değişimleri numpy ile yıl x nokta matrisi üzerinden, kesişim yaşı olarak bulunur.
+    Dönüş: yaşa göre sıralı TimelineEvent listesi.
+    """
+    dts = [utc_dt + timedelta(days=y) for y in range(years + 1)]
+    names, prog = ephemeris_longitudes(dts, lat, lon)
+    events = _timeline_events("İkincil", names, prog, natal, orb)
+
+    # solar ark: progresif Güneş'in kat ettiği yay tüm natal noktalara eklenir
+    arc = (prog[:, names.index("Güneş")] - prog[0, names.index("Güneş")]) % 360
+    sa_names = [p.planet for p in natal.placements]
+    sa = (np.array([p.deg for p in natal.placements])[None, :] + arc[:, None]) % 360
+    events += _timeline_events("Solar ark", sa_names, sa, natal, orb)
+
+    events.sort(key=lambda e: (e.age, e.method != "İkincil"))
+    return events
+
+# =========================
+# SOLAR / LUNAR RETURNS (toplu kök bulma)
+# =========================
+RETURN_BODIES = {"Güneş": ephem.Sun, "Ay": ephem.Moon}
+RETURN_PERIODS = {"Güneş": 365.242190, "Ay": 27.321582}   # tropik, gün
+# başlangıç tahmini için kısa seriler: ortalama boylam (J2000, derece + derece/gün) ve
+# başlıca periyodik terimler (genlik, argüman J2000'de, argüman hızı)
+RETURN_SERIES = {
+    "Güneş": (280.460, 0.9856474, [
+        (1.915, 357.528, 0.9856003),     # merkez denklemi
+        (0.020, 715.056, 1.9712006),
+    ]),
+    "Ay": (218.316, 13.176396, [
+        (6.289, 134.963, 13.064993),     # merkez denklemi (M)
+        (1.274, 460.737, 11.316505),     # eveksiyon (2D - M)
+        (0.658, 595.700, 24.381498),     # varyasyon (2D)
+        (0.214, 269.926, 26.129986),     # 2M
+        (-0.186, 357.529, 0.9856003),    # yıllık denklem (Güneş'in M'si)
+        (-0.114, 186.544, 26.458700),    # 2F
+    ]),
+}
+RETURN_TABLE_BODIES = ["Güneş", "Ay"]   # dönüş tablosu; ilk dönüş ayrıca tam harita
+
+def _wrap180(x):
+    return (x + 180.0) % 360.0 - 180.0
+
+def approx_longitude(planet, ed):
+    """
+    RETURN_SERIES ile yaklaşık boylam ve hız (derece, derece/gün); ed: ephem.Date float dizisi.
+    Efemeris yerine sadece kök tahmini için: Ay'da topo-merkezli gerçek boylamdan sapma ~0.3°.
+    """
+    mean, rate, terms = RETURN_SERIES[planet]
+    d = np.asarray(ed, dtype=float) - 36525.0    # J2000.0 = ephem.Date 36525.0
+    lon, speed = mean + rate * d, rate
+    for amp, arg0, arg_rate in terms:
+        arg = np.radians(arg0 + arg_rate * d)
+        lon = lon + amp * np.sin(arg)
+        speed = speed + amp * np.cos(arg) * np.radians(arg_rate)
+    return lon % 360, speed
+
+def body_longitudes(body, obs, ed):
+    """ed: ephem.Date float dizisi -> aynı Observer ile ekliptik boylamlar."""
+    ra = np.empty(len(ed))
+    dec = np.empty(len(ed))
+    for i, d in enumerate(ed):
+        obs.date = float(d)
+        obs.epoch = obs.date
+        body.compute(obs)
+        ra[i], dec[i] = body.a_ra, body.a_dec
+    return ecliptic_lon(ra, dec, ed)
+
+def find_returns(planet, natal_deg, birth_utc, lat, lon, start_utc, end_utc, tol_deg=1e-4, max_iter=10):
+    """
+    Güneş/Ay'ın natal boylamına döndüğü UTC anları (start..end).
+    Dakika dakika taramak yerine: ortalama periyot + approx_longitude üzerinde Newton ile
+    başlangıç tahmini (efemeris çağrısı yok, hata < ~0.4°) + tüm dönüşler için birlikte
+    secant iterasyonu (her adımda dönüş başına 1 efemeris çağrısı; kök başına ortalama ~2.5).
+    Not: natal boylam doğum yeri gözlemcisiyle hesaplandığı için kök de aynı gözlemciyle aranır.
+    Dönüş: (UTC anları, max_iter içinde tol_deg'e yakınsamadığı için çıkarılan kök sayısı)
+    """
+    period = RETURN_PERIODS[planet]
+    body = RETURN_BODIES[planet]()
+    obs = ephem.Observer()
+    obs.lat, obs.lon = str(lat), str(lon)
+
+    birth = float(ephem.Date(birth_utc.strftime("%Y/%m/%d %H:%M:%S")))
+    t0 = float(ephem.Date(start_utc.strftime("%Y/%m/%d %H:%M:%S")))
+    t1 = float(ephem.Date(end_utc.strftime("%Y/%m/%d %H:%M:%S")))
+    k = np.arange(math.floor((t0 - birth) / period), math.ceil((t1 - birth) / period) + 1)
+    k = k[k >= 1]
+    if len(k) == 0:
+        return [], 0
+
+    x0 = birth + k * period
+    for _ in range(3):
+        approx, speed = approx_longitude(planet, x0)
+        x0 = x0 - _wrap180(approx - natal_deg) / speed
+    f0 = _wrap180(body_longitudes(body, obs, x0) - natal_deg)
+    x1 = x0 - f0 / approx_longitude(planet, x0)[1]
+    conv = np.zeros(len(x1), dtype=bool)
+    active = np.arange(len(x1))      # sadece yakınsamamış dönüşler yeniden hesaplanır
+    for _ in range(max_iter):
+        f1 = _wrap180(body_longitudes(body, obs, x1[active]) - natal_deg)
+        done = np.abs(f1) <= tol_deg
+        conv[active[done]] = True
+        idx, f1 = active[~done], f1[~done]
+        if len(idx) == 0:
+            break
+        df = f1 - f0[idx]
+        ok = np.abs(df) > 1e-12
+        fallback = f1 / approx_longitude(planet, x1[idx])[1]
+        step = np.where(ok, f1 * (x1[idx] - x0[idx]) / np.where(ok, df, 1.0), fallback)
+        x0[idx], f0[idx] = x1[idx], f1
+        x1[idx] = x1[idx] - step
+        active = idx
+
+    in_range = (x1 >= t0) & (x1 <= t1)
+    unconverged = int((in_range & ~conv).sum())
+    x1 = np.sort(x1[in_range & conv])
+    x1 = x1[np.r_[True, np.diff(x1) > 1e-6]]    # aynı köke yakınsayan tahminler (yuvarlamadan)
+    return [ephem.Date(x).datetime() for x in x1], unconverged
+
+def sidereal_degs(utc_dts, lat, lon):
+    """calculate_placidus_cusps'taki RAMC (derece), tarih başına."""
+    obs = ephem.Observer()
+    obs.lat, obs.lon = str(lat), str(lon)
+    out = np.empty(len(utc_dts))
+    for i, dt in enumerate(utc_dts):
+        obs.date = dt.strftime("%Y/%m/%d %H:%M:%S")
+        out[i] = math.degrees(float(obs.sidereal_time()))
+    return out
+
+def compute_natal_batch(utc_dts, lat, lon, names=None):
+    """
+    compute_natal'ın çok tarihli hali (aynı cusp/ev/açı kuralları): tek efemeris geçişi,
+    placidus_cusps_vec + houses_of_degs_rows, açılar (harita, çift, açı) dizisinde.
+    names: sadece bu gezegenler (yerleşim + aralarındaki açılar); None = compute_natal ile aynı tam harita.
+    """
+    if not len(utc_dts):
+        return []
+    names, pos = ephemeris_longitudes(utc_dts, lat, lon, names)
+    cusps_arr = placidus_cusps_vec(sidereal_degs(utc_dts, lat, lon), lat)
+    houses = np.stack([houses_of_degs_rows(pos[:, j], cusps_arr) for j in range(len(names))], axis=1)
+
+    # compute_natal sırası: i<j çiftleri, ASPECT_ANGLES sırasında orb'a giren ilk açı
+    ii, jj = np.triu_indices(len(names), 1)
+    dd = np.abs(pos[:, ii] - pos[:, jj])
+    dd = np.minimum(dd, 360 - dd)
+    asp_names = list(ASPECT_ANGLES)
+    asp_angles = np.array([ASPECT_ANGLES[a] for a in asp_names], dtype=float)
+    asp_orbs = np.array([ASPECT_ORBS.get(a, 8) for a in asp_names], dtype=float)
+    within = np.abs(dd[..., None] - asp_angles) <= asp_orbs
+    has = within.any(axis=-1)
+    first = within.argmax(axis=-1)
+
+    results = []
+    for n in range(len(utc_dts)):
+        cusps = {i + 1: float(cusps_arr[n, i]) for i in range(12)}
+        placements = [
+            Placement("ASC", sign_name(cusps[1]), cusps[1], 1),
+            Placement("MC", sign_name(cusps[10]), cusps[10], 10),
+        ]
+        for j, pname in enumerate(names):
+            deg = float(pos[n, j])
+            placements.append(Placement(pname, sign_name(deg), deg, int(houses[n, j])))
+        aspects = [
+            Aspect(names[ii[k]], asp_names[first[n, k]], names[jj[k]], float(dd[n, k]))
+            for k in np.nonzero(has[n])[0]
+        ]
+        elem_count, qual_count = count_elements_qualities(placements)
+        results.append(NatalResult(cusps, placements, aspects, elem_count, qual_count))
+    return results
+
+def compute_returns(planet, natal, birth_utc, birth_lat, birth_lon, start_utc, end_utc, ret_lat, ret_lon, names=None):
+    """
+    Her dönüş anı natal akışının toplu halinden geçer (cusp, ev, açı).
+    names: haritalarda hesaplanacak gezegenler (None = tam harita; tablo için RETURN_TABLE_BODIES).
+    Dönüş: (ReturnChart listesi, yakınsamadığı için çıkarılan dönüş sayısı)
+    """
+    natal_deg = next(p.deg for p in natal.placements if p.planet == planet)
+    moments, unconverged = find_returns(planet, natal_deg, birth_utc, birth_lat, birth_lon, start_utc, end_utc)
+    charts = compute_natal_batch(moments, ret_lat, ret_lon, names)
+    return [ReturnChart(planet, m, c) for m, c in zip(moments, charts)], unconverged
+
+# =========================
+# BIRTH-TIME RECTIFICATION (aday dakikalar x olaylar, vektörel)
+# =========================
+RECT_TRANSIT_BODIES = ["Güneş","Mars","Jüpiter","Satürn","Uranüs","Neptün","Plüton"]
+RECT_ASPECTS = ("Kavuşum","Kare","Karşıt")
+RECT_TRANSIT_ORB = 2.0
+RECT_DIRECTION_ORB = 1.0
+# ara cusp'lar (2,3,5,6,8,9,11,12. ev): yalnız kavuşum, yarım ağırlık
+# (1/4/7/10 köşeleri ASC/MC'ye RECT_ASPECTS ile zaten dahil)
+RECT_CUSP_COLS = [1, 2, 4, 5, 7, 8, 10, 11]
+RECT_CUSP_WEIGHT = 0.5
+SIDEREAL_DEG_PER_DAY = 360.98564736629
+
+def parse_life_events(text):
+    """Her satır: 'YYYY-AA-GG [açıklama]' -> [(datetime 12:00 UTC, açıklama), ...]"""
+    events = []
+    for line in text.splitlines():
+        parts = line.strip().split(maxsplit=1)
+        if not parts:
+            continue
+        try:
+            d = datetime.strptime(parts[0], "%Y-%m-%d")
+        except ValueError:
+            continue
+        events.append((d.replace(hour=12), parts[1] if len(parts) > 1 else ""))
+    return events
+
+def _contact_score(a, b, orb, aspects=RECT_ASPECTS):
+    """a ve b boylamları arasında temas puanı (açı başına): tam açıda 1, orb sınırında 0."""
+    d = np.abs(a - b) % 360
+    d = np.minimum(d, 360 - d)
+    score = np.zeros(d.shape)
+    for asp in aspects:
+        score += np.clip(1 - np.abs(d - ASPECT_ANGLES[asp]) / orb, 0, None)
+    return score
+
+def rectify_birth_time(local_start, local_end, utc_offset_hours, lat, lon, life_events, step_min=1, top=10):
+    """
+    Pencere içindeki her aday dakika için 12 cusp (placidus_cusps_vec) hesaplanır ve
+    olay tarihlerindeki (a) transit temaslar ve (b) solar ark ile yönlendirilmiş
+    cusp'ların (her adayın kendi) natal gezegenlerine temasları puanlanır:
+    ASC/MC için RECT_ASPECTS, ara cusp'lar için kavuşum x RECT_CUSP_WEIGHT.
+    Adaylar x olaylar x noktalar tek numpy ifadesinde; efemeris olay başına ve
+    pencerenin her saati için bir kez çağrılır.
+    utc_offset_hours: pencere başındaki yerel-UTC farkı (pencere içinde sabit kabul edilir).
+    """
+    n = int((local_end - local_start).total_seconds() // 60 // step_min) + 1
+    minutes = np.arange(n) * step_min
+    utc0 = local_start - timedelta(hours=utc_offset_hours)
+    utc_mid = utc0 + timedelta(minutes=float(minutes[-1]) / 2)
+
+    obs = ephem.Observer()
+    obs.lat, obs.lon = str(lat), str(lon)
+    obs.date = utc0.strftime("%Y/%m/%d %H:%M:%S")
+    ramc0 = math.degrees(float(obs.sidereal_time()))
+    cusps = placidus_cusps_vec(ramc0 + SIDEREAL_DEG_PER_DAY * minutes / 1440.0, lat)
+    angles = cusps[:, [0, 9]]                                   # (C, 2) ASC, MC
+    mid_cusps = cusps[:, RECT_CUSP_COLS]                        # (C, 8)
+
+    # natal gezegenler aday başına: saatlik örnek + lineer ara değer (Ay pencerede ~13° yol alır)
+    sample_min = np.arange(0, minutes[-1] + 60, 60)
+    names, natal_h = ephemeris_longitudes([utc0 + timedelta(minutes=int(m)) for m in sample_min], lat, lon)
+    natal_h = np.degrees(np.unwrap(np.radians(natal_h), axis=0))
+    natal_c = np.stack([np.interp(minutes, sample_min, natal_h[:, j]) for j in range(len(names))], axis=1) % 360
+    _, natal_mid = ephemeris_longitudes([utc_mid], lat, lon)
+    if not life_events:
+        return []
+    ev_dts = [d for d, _ in life_events]
+    _, tr = ephemeris_longitudes(ev_dts, lat, lon)
+    tr = tr[:, [names.index(b) for b in RECT_TRANSIT_BODIES]]   # (E, K)
+
+    # solar ark: yaş (yıl) kadar gün sonraki Güneş - natal Güneş
+    ages = [(d - utc_mid).total_seconds() / 86400.0 / 365.2422 for d in ev_dts]
+    _, prog = ephemeris_longitudes([utc_mid + timedelta(days=a) for a in ages], lat, lon)
+    sun = names.index("Güneş")
+    arc = (prog[:, sun] - natal_mid[0, sun]) % 360              # (E,)
+
+    conj = ("Kavuşum",)
+    transit_score = _contact_score(angles[:, None, None, :], tr[None, :, :, None], RECT_TRANSIT_ORB).sum(axis=(1, 2, 3))
+    transit_score += RECT_CUSP_WEIGHT * _contact_score(
+        mid_cusps[:, None, None, :], tr[None, :, :, None], RECT_TRANSIT_ORB, conj
+    ).sum(axis=(1, 2, 3))
+
+    directed = (angles[:, None, :] + arc[None, :, None]) % 360  # (C, E, 2)
+    directed_mid = (mid_cusps[:, None, :] + arc[None, :, None]) % 360
+    direction_score = _contact_score(directed[..., None], natal_c[:, None, None, :], RECT_DIRECTION_ORB).sum(axis=(1, 2, 3))
+    direction_score += RECT_CUSP_WEIGHT * _contact_score(
+        directed_mid[..., None], natal_c[:, None, None, :], RECT_DIRECTION_ORB, conj
+    ).sum(axis=(1, 2, 3))
+    total = transit_score + direction_score
+
+    best = np.argsort(-total, kind="stable")[:top]
+    return [
+        RectificationCandidate(
+            local_start + timedelta(minutes=int(minutes[i])),
+            utc0 + timedelta(minutes=int(minutes[i])),
+            float(total[i]), float(angles[i, 0]), float(angles[i, 1]),
+        )
+        for i in best
+    ]
+
+# =========================
+# ELECTIONAL SEARCH (bildirimsel kurallar; saatlik ızgara + dakika inceltme)
+# =========================
+# kind: "aspect" (transit gezegen -> natal nokta) | "moon_house" (chart: "election" | "natal")
+# mode: "forbid" (olmamalı) | "require" (olmalı) | "prefer" (puan, weight)
+ELECTION_RULES = [
+    {"name": "Satürn/Mars sert açı yok", "kind": "aspect", "mode": "forbid",
+     "bodies": ["Satürn","Mars"], "aspects": ["Kavuşum","Kare","Karşıt"], "orb": 2.0},
+    {"name": "Ay 6/8/12. evde değil", "kind": "moon_house", "mode": "forbid", "chart": "election", "houses": [6, 8, 12]},
+    {"name": "Venüs/Jüpiter kavuşumu", "kind": "aspect", "mode": "prefer",
+     "bodies": ["Venüs","Jüpiter"], "aspects": ["Kavuşum"], "orb": 3.0, "weight": 2.0},
+]
+ELECTION_SLOW_STEP_H = 24   # Ay dışındaki gezegenler günlük örneklenir
+
+def build_election_rules(malefic_orb=2.0, moon_houses=(6, 8, 12), benefic_orb=3.0):
+    rules = [dict(r) for r in ELECTION_RULES]
+    rules[0]["orb"] = float(malefic_orb)
+    rules[1]["houses"] = list(moon_houses)
+    rules[1]["name"] = f"Ay {'/'.join(str(h) for h in moon_houses)}. evde değil"
+    rules[2]["orb"] = float(benefic_orb)
+    return [r for r in rules if r["kind"] != "moon_house" or r["houses"]]
+
+def _signed_aspects(aspects):
+    """Açıyı her iki yönde (ör. Kare: 90 ve 270) -> (ofsetler, açı adları)."""
+    pairs = sorted({(ASPECT_ANGLES[a] % 360, a) for a in aspects} | {((-ASPECT_ANGLES[a]) % 360, a) for a in aspects})
+    return np.array([o for o, _ in pairs], dtype=float), [a for _, a in pairs]
+
+def sample_rule_bodies(names, start_utc, hours, lat, lon):
+    """Ay saatlik, diğerleri günlük; hepsi saatlik ızgaraya (unwrap + np.interp) -> (hours+1, B) boylam."""
+    grid_h = np.arange(hours + 1)
+    out = np.empty((len(grid_h), len(names)))
+    for j, name in enumerate(names):
+        step = 1 if name == "Ay" else ELECTION_SLOW_STEP_H
+        sample_h = np.arange(0, hours + step, step)
+        _, pos = ephemeris_longitudes([start_utc + timedelta(hours=int(h)) for h in sample_h], lat, lon, names=[name])
+        out[:, j] = np.interp(grid_h, sample_h, np.degrees(np.unwrap(np.radians(pos[:, 0]))))
+    return out
+
+def _aspect_rule_hours(rule, lon_h, cols, natal_degs):
+    """
+    Saatlik aralık başına (aralık içinde boylam lineer):
+    full = aralığın tamamı orb içinde, touch = bir kısmı orb içinde, close = orta noktada yakınlık.
+    Boyutlar (K, gezegen, natal nokta, açı).
+    """
+    offs, _ = _signed_aspects(rule["aspects"])
+    orb = rule["orb"]
+    f0 = _wrap180(lon_h[:-1, cols][:, :, None, None] - natal_degs[None, None, :, None] - offs)
+    df = np.diff(lon_h[:, cols], axis=0)[:, :, None, None]
+    f1 = f0 + df
+    full = (np.abs(f0) <= orb) & (np.abs(f1) <= orb)
+    touch = (np.minimum(f0, f1) <= orb) & (np.maximum(f0, f1) >= -orb)
+    close = np.clip(1 - np.abs(f0 + df / 2) / orb, 0, None)
+    return f0, df, full, touch, close
+
+def election_search(natal, lat, lon, start_utc, end_utc, rules=ELECTION_RULES, min_len_min=20, top=10):
+    """
+    Kurallar önce saatlik aralıklarda değerlendirilir: bir yasak açının aralığın tamamını
+    kapladığı (veya zorunlu açının hiç değmediği) saatler budanır. Kalan saatlerde dakika
+    çözünürlüğü yalnızca gerekli yerde açılır: sınır saatlerinde açılar, Ay-ev kurallarında
+    seçim haritası cusp'ları (placidus_cusps_vec, RAMC zamanla lineer).
+    Dönüş: puana (sonra süreye) göre sıralı ElectionWindow listesi.
+    """
+    total_min = int((end_utc - start_utc).total_seconds() // 60)
+    hours = -(-total_min // 60)
+    if hours <= 0:
+        return []
+    order = list(get_planet_objects())
+    names = sorted({b for r in rules if r["kind"] == "aspect" for b in r["bodies"]} | {"Ay"}, key=order.index)
+    lon_h = sample_rule_bodies(names, start_utc, hours, lat, lon)
+
+    alive = np.ones(hours, dtype=bool)
+    refine = []           # (rule, f0, df, kısmi saat maskesi)
+    score_h = np.zeros(hours)
+    prefer_hits = []      # (rule, close, gezegenler, natal adları, açı adları)
+    for r in rules:
+        if r["kind"] != "aspect":
+            continue
+        targets = [p for p in natal.placements if r.get("targets") is None or p.planet in r["targets"]]
+        cols = [names.index(b) for b in r["bodies"]]
+        f0, df, full, touch, close = _aspect_rule_hours(r, lon_h, cols, np.array([p.deg for p in targets]))
+        full_h = full.any(axis=(1, 2, 3))
+        touch_h = touch.any(axis=(1, 2, 3))
+        if r["mode"] == "forbid":
+            alive &= ~full_h
+            refine.append((r, f0, df, touch_h & ~full_h))
+        elif r["mode"] == "require":
+            alive &= touch_h
+            refine.append((r, f0, df, touch_h & ~full_h))
+        else:
+            score_h += r.get("weight", 1.0) * close.max(axis=(1, 2, 3))
+            prefer_hits.append((r, close, r["bodies"], [p.planet for p in targets], _signed_aspects(r["aspects"])[1]))
+
+    ks = np.nonzero(alive)[0]
+    frac = np.arange(60) / 60.0
+    minute = ks[:, None] * 60 + np.arange(60)[None, :]          # (A, 60) başlangıçtan dakika
+    ok = minute < total_min
+    score = np.repeat(score_h[ks][:, None], 60, axis=1)
+
+    # sınır saatleri: açı dakika dakika
+    for r, f0, df, part_h in refine:
+        idx = np.nonzero(part_h[ks])[0]
+        if not len(idx):
+            continue
+        kk = ks[idx]
+        f = f0[kk][:, None] + df[kk][:, None] * frac[None, :, None, None, None]
+        active = (np.abs(f) <= r["orb"]).any(axis=(2, 3, 4))
+        ok[idx] &= ~active if r["mode"] == "forbid" else active
+
+    # Ay-ev kuralları (yalnızca hâlâ uygun dakikalar)
+    moon_col = names.index("Ay")
+    moon = (lon_h[ks, moon_col][:, None] + np.diff(lon_h[:, moon_col])[ks][:, None] * frac) % 360
+    election_houses = None
+    for r in rules:
+        if r["kind"] != "moon_house":
+            continue
+        sel = ok if r["mode"] != "prefer" else np.ones_like(ok)
+        house = np.zeros(ok.shape, dtype=int)
+        if r.get("chart", "election") == "natal":
+            house[sel] = houses_of_degs(moon[sel], natal.cusps)
+        else:
+            if election_houses is None:
+                obs = ephem.Observer()
+                obs.lat, obs.lon = str(lat), str(lon)
+                obs.date = start_utc.strftime("%Y/%m/%d %H:%M:%S")
+                ramc0 = math.degrees(float(obs.sidereal_time()))
+                election_houses = np.zeros(ok.shape, dtype=int)
+                cusps = placidus_cusps_vec(ramc0 + SIDEREAL_DEG_PER_DAY * minute[sel] / 1440.0, lat)
+                election_houses[sel] = houses_of_degs_rows(moon[sel], cusps)
+            house = election_houses
+        hit = np.isin(house, r["houses"])
+        if r["mode"] == "forbid":
+            ok &= ~hit
+        elif r["mode"] == "require":
+            ok &= hit
+        else:
+            score += r.get("weight", 1.0) * hit
+
+    # ardışık uygun dakikalar -> pencereler
+    good = minute[ok]
+    good_score = score[ok]
+    if not len(good):
+        return []
+    starts = np.r_[0, np.nonzero(np.diff(good) != 1)[0] + 1]
+    ends = np.r_[starts[1:], len(good)]
+    lengths = ends - starts
+    means = np.add.reduceat(good_score, starts) / lengths
+    keep = np.nonzero(lengths >= min_len_min)[0]
+    keep = keep[np.lexsort((-lengths[keep], -means[keep]))][:top]
+
+    windows = []
+    for w in keep:
+        s0, s1 = starts[w], ends[w]
+        best = int(good[s0 + int(np.argmax(good_score[s0:s1]))])
+        notes = []
+        for r, close, bodies, targets, asp_names in prefer_hits:
+            c = close[best // 60]
+            for b, p, a in zip(*np.nonzero(c > 0)):
+                notes.append(f"{bodies[b]} {asp_names[a]} {targets[p]}")
+        windows.append(ElectionWindow(
+            start_utc + timedelta(minutes=int(good[s0])),
+            start_utc + timedelta(minutes=int(good[s1 - 1]) + 1),
+            float(means[w]),
+            start_utc + timedelta(minutes=best),
+            notes,
+        ))
+    return windows
+
+# =========================
+# ASTROCARTOGRAPHY (1°x1° dünya ızgarası)
+# =========================
+ACG_LATS = np.arange(-89.5, 90.0, 1.0)
+ACG_LONS = np.arange(-180.0, 180.0, 1.0)
+ACG_ANGLES = ["ASC","DSC","MC","IC"]
+ACG_MAX_LAT = 66.0   # kutup dairesinde ASC/Placidus tanımsız
+ACG_STYLES = {"ASC": "-", "DSC": "--", "MC": "-", "IC": ":"}
+ACG_LABEL_LAT = {"ASC": 25.0, "DSC": -25.0, "MC": 60.0, "IC": -60.0}   # etiketler üst üste binmesin
+ACG_COLORS = {
+    "Güneş":"#FFD700", "Ay":"#C0C0C0", "Merkür":"#7FDBFF", "Venüs":"#FF85C0", "Mars":"#FF4B4B",
+    "Jüpiter":"#FF9F1C", "Satürn":"#A0856C", "Uranüs":"#2ECC71", "Neptün":"#5B8CFF", "Plüton":"#B47CFF",
+}
+
+def astrocartography_lines(utc_dt, planet_degs):
+    """
+    Izgaradaki her nokta için ASC/MC placidus_cusps_vec ile tek seferde hesaplanır
+    (RAMC = Greenwich yıldız zamanı + boylam). Her açı/gezegen için her enlem satırında
+    açının gezegen boylamına eşitlendiği boylam lineer ara değerle bulunur.
+    planet_degs: {gezegen: ekliptik boylam}
+    Dönüş: (gezegen adları, lines[açı, gezegen, enlem] -> boylam; hat yoksa NaN)
+    """
+    obs = ephem.Observer()
+    obs.lat, obs.lon = "0", "0"
+    obs.date = utc_dt.strftime("%Y/%m/%d %H:%M:%S")
+    gst = math.degrees(float(obs.sidereal_time()))
+
+    lat_g, lon_g = np.meshgrid(ACG_LATS, ACG_LONS, indexing="ij")
+    cusps = placidus_cusps_vec(gst + lon_g.ravel(), lat_g.ravel())
+    asc = cusps[:, 0].reshape(lat_g.shape)
+    mc = cusps[:, 9].reshape(lat_g.shape)
+    grids = {"ASC": asc, "DSC": (asc + 180) % 360, "MC": mc, "IC": (mc + 180) % 360}
+
+    names = list(planet_degs)
+    degs = np.array([planet_degs[n] for n in names])
+    step = ACG_LONS[1] - ACG_LONS[0]
+    polar = np.abs(ACG_LATS) > ACG_MAX_LAT
+    lines = np.full((len(ACG_ANGLES), len(names), len(ACG_LATS)), np.nan)
+    for a, angle in enumerate(ACG_ANGLES):
+        diff = _wrap180(grids[angle][None] - degs[:, None, None])      # (P, enlem, boylam)
+        nxt = np.roll(diff, -1, axis=-1)                               # 180° -> -180° dikişi dahil
+        # açılar boylamla artar: negatiften pozitife geçiş (±180 sarması hariç)
+        cross = (diff < 0) & (nxt >= 0) & (nxt - diff < 90)
+        j = np.argmax(cross, axis=-1)
+        d0 = np.take_along_axis(diff, j[..., None], -1)[..., 0]
+        d1 = np.take_along_axis(nxt, j[..., None], -1)[..., 0]
+        lon_at = _wrap180(ACG_LONS[j] + step * (-d0 / (d1 - d0)))
+        lines[a] = np.where(cross.any(axis=-1) & ~polar, lon_at, np.nan)
+    return names, lines
+
+def acg_nearest_lines(names, lines, lat, lon, top=8):
+    """Konuma boylam yönünde en yakın hatlar: [(gezegen, açı, km), ...] (yaklaşık)."""
+    row = int(np.argmin(np.abs(ACG_LATS - lat)))
+    dlon = np.abs(_wrap180(lines[:, :, row] - lon))
+    km = dlon * 111.32 * math.cos(math.radians(lat))
+    order = np.argsort(np.where(np.isnan(km), np.inf, km), axis=None)[:top]
+    out = []
+    for k in order:
+        a, p = np.unravel_index(k, km.shape)
+        if np.isfinite(km[a, p]):
+            out.append((names[p], ACG_ANGLES[a], float(km[a, p])))
+    return out
+
+ACG_CACHE_ENTRIES = 32   # PNG başına birkaç yüz KB; harita başına yeni anahtar -> sınırlı tut
+
+@st.cache_data(show_spinner=False, max_entries=ACG_CACHE_ENTRIES, ttl=3600)
+def render_astrocartography_png(names, lines, marks):
+    """Hat haritası PNG; marks: ((etiket, enlem, boylam), ...). Aynı girdi için önbellekten döner."""
+    fig = plt.figure(figsize=(12, 6), facecolor='#0e1117')
+    ax = fig.add_subplot(111)
+    ax.set_facecolor('#1a1c24')
+    ax.set_xlim(-180, 180); ax.set_ylim(-ACG_MAX_LAT, ACG_MAX_LAT)
+    ax.set_xticks(range(-180, 181, 30)); ax.set_yticks(range(-60, 61, 20))
+    ax.grid(color='#333', linewidth=0.5)
+    ax.tick_params(colors='#9aa0aa')
+    for s in ax.spines.values():
+        s.set_color('#444')
+
+    for a, angle in enumerate(ACG_ANGLES):
+        for p, name in enumerate(names):
+            x = lines[a, p]
+            # boylam dikişinde çizgiyi kopar
+            x = np.where(np.abs(np.diff(x, prepend=x[0])) > 90, np.nan, x)
+            ax.plot(x, ACG_LATS, ACG_STYLES[angle], color=ACG_COLORS.get(name, 'white'),
+                    linewidth=1.6 if angle in ("ASC","MC") else 1.0,
+                    label=name if a == 0 else None)
+            i = int(np.argmin(np.abs(ACG_LATS - ACG_LABEL_LAT[angle])))
+            if np.isfinite(x[i]):
+                ax.text(x[i], ACG_LATS[i], f"{PLANET_SYMBOLS.get(name, '')}{angle}",
+                        color=ACG_COLORS.get(name, 'white'), fontsize=7, ha='center', va='bottom')
+
+    for label, lt, ln in marks:
+        ax.plot(ln, lt, '*', color='white', markersize=12, markeredgecolor='#FFD700')
+        ax.text(ln, lt - 5, label, color='white', fontsize=8, ha='center')
+
+    ax.legend(loc='lower left', ncol=5, fontsize=8, facecolor='#1a1c24', labelcolor='white', edgecolor='#444')
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=110, bbox_inches="tight", facecolor=fig.get_facecolor())
+    plt.close(fig)
+    return buf.getvalue()
+
 # =========================
 # CHART VISUAL (smaller)
 # =========================
-def draw_chart_visual(bodies_data, cusps):
+def draw_chart_visual(placements, cusps):
     # daha küçük ve dengeli görünüm
     fig = plt.figure(figsize=(7.2, 7.2), facecolor='#0e1117')
     ax = fig.add_subplot(111, projection='polar')
@@ -517,7 +1719,8 @@ def draw_chart_visual(bodies_data, cusps):
         ax.plot([sep, sep], [1.04, 1.12], color='#FFD700')
 
     # bodies
-    for name, sign, deg, sym in bodies_data:
+    for p in placements:
+        name, deg, sym = p.planet, p.deg, p.symbol
         rad = math.radians(deg)
         c = '#FF4B4B' if name in ("ASC","MC") else 'white'
         s = 12 if name in ("ASC","MC") else 9
@@ -531,27 +1734,27 @@ def draw_chart_visual(bodies_data, cusps):
 # =========================
 def rule_based_summary(
     placements,
-    aspects_raw,
+    aspects,
     elem_scores, qual_scores,
     dom_elem, dom_qual,
     transit_hits_sorted=None, transit_house_themes=None,
     question=""
 ):
-    asc = next((p for p in placements if p["planet"]=="ASC"), None)
-    mc  = next((p for p in placements if p["planet"]=="MC"), None)
-    sun = next((p for p in placements if p["planet"]=="Güneş"), None)
-    moon= next((p for p in placements if p["planet"]=="Ay"), None)
+    asc = next((p for p in placements if p.planet=="ASC"), None)
+    mc  = next((p for p in placements if p.planet=="MC"), None)
+    sun = next((p for p in placements if p.planet=="Güneş"), None)
+    moon= next((p for p in placements if p.planet=="Ay"), None)
 
-    hard = [a for a in aspects_raw if a[1] in ("Kare","Karşıt")]
-    soft = [a for a in aspects_raw if a[1] in ("Sekstil","Üçgen")]
-    conj = [a for a in aspects_raw if a[1] == "Kavuşum"]
+    hard = [a for a in aspects if a.aspect in ("Kare","Karşıt")]
+    soft = [a for a in aspects if a.aspect in ("Sekstil","Üçgen")]
+    conj = [a for a in aspects if a.aspect == "Kavuşum"]
 
     lines = []
     lines.append("## Kural Tabanlı Özet (AI yoksa da çalışır)")
-    if asc: lines.append(f"- **Yükselen {asc['sign']}**: dışa yansıyan stil ve yaklaşım.")
-    if sun: lines.append(f"- **Güneş {sun['sign']} ({sun['house']}. ev)**: {HOUSE_TOPICS.get(sun['house'])} alanında kimlik vurgusu.")
-    if moon: lines.append(f"- **Ay {moon['sign']} ({moon['house']}. ev)**: {HOUSE_TOPICS.get(moon['house'])} alanında duygusal hassasiyet.")
-    if mc:  lines.append(f"- **MC {mc['sign']}**: kariyer/itibar yönelimi.")
+    if asc: lines.append(f"- **Yükselen {asc.sign}**: dışa yansıyan stil ve yaklaşım.")
+    if sun: lines.append(f"- **Güneş {sun.sign} ({sun.house}. ev)**: {HOUSE_TOPICS.get(sun.house)} alanında kimlik vurgusu.")
+    if moon: lines.append(f"- **Ay {moon.sign} ({moon.house}. ev)**: {HOUSE_TOPICS.get(moon.house)} alanında duygusal hassasiyet.")
+    if mc:  lines.append(f"- **MC {mc.sign}**: kariyer/itibar yönelimi.")
 
     # ✅ ARTIK PUANLI baskınlık (tablo ile aynı!)
     lines.append(f"- **Baskın element (puan):** {dom_elem} | **Baskın nitelik (puan):** {dom_qual}")
@@ -561,8 +1764,7 @@ def rule_based_summary(
     lines.append("")
     lines.append("## Açılar (Öne çıkanlar)")
     def fmt(a):
-        p1, asp, p2, ang = a
-        return f"- **{p1} {asp} {p2}** ({round(ang,1)}°): {ASPECT_MEANING.get(asp,'')}"
+        return f"- **{a.p1} {a.aspect} {a.p2}** ({round(a.angle,1)}°): {ASPECT_MEANING.get(a.aspect,'')}"
     if conj[:3]:
         lines.append("**Kavuşumlar:**")
         for a in conj[:3]: lines.append(fmt(a))
@@ -587,8 +1789,8 @@ def rule_based_summary(
                 lines.append(f"- {t}")
         if transit_hits_sorted:
             lines.append("\n**Öncelikli temaslar:**")
-            for s,t in transit_hits_sorted[:10]:
-                lines.append(f"- {t}")
+            for h in transit_hits_sorted[:10]:
+                lines.append(f"- {h}")
 
     return "\n".join(lines)
 
@@ -677,6 +1879,63 @@ with st.sidebar:
             start_date = t1.date_input("Başlangıç", value=start_date)
             end_date = t2.date_input("Bitiş", value=end_date)
 
+        st.write("---")
+        st.subheader("Progresyon")
+        progression_mode = st.checkbox("Ömür boyu progresyon zaman çizelgesi", value=False)
+        prog_years = 90
+        if progression_mode:
+            prog_years = st.number_input("Kaç yıl", value=90, min_value=1, max_value=120, step=1)
+
+        st.write("---")
+        st.subheader("Dönüş Haritaları")
+        return_mode = st.checkbox("Solar / Lunar dönüşleri bul", value=False)
+        return_planet = "Güneş"
+        return_start_year = date.today().year
+        return_years = 1
+        return_city = ""
+        if return_mode:
+            return_planet = st.radio("Dönüş", options=["Güneş","Ay"], format_func=lambda x: "Solar (Güneş)" if x=="Güneş" else "Lunar (Ay)")
+            r1, r2 = st.columns(2)
+            return_start_year = r1.number_input("Başlangıç yılı", value=date.today().year, min_value=1900, max_value=2100, step=1)
+            return_years = r2.number_input("Kaç yıl", value=1, min_value=1, max_value=100, step=1)
+            return_city = st.text_input("Dönüş konumu (boş = doğum yeri)", value="")
+
+        st.write("---")
+        st.subheader("Doğum Saati Düzeltme")
+        rect_mode = st.checkbox("Rektifikasyon (saat bilinmiyorsa)", value=False)
+        rect_from = time(0, 0)
+        rect_to = time(23, 59)
+        rect_events_text = ""
+        if rect_mode:
+            w1, w2 = st.columns(2)
+            rect_from = w1.time_input("Pencere başı", value=time(0, 0), step=60)
+            rect_to = w2.time_input("Pencere sonu", value=time(23, 59), step=60)
+            rect_events_text = st.text_area("Yaşam olayları (her satır: YYYY-AA-GG açıklama)", value="")
+
+        st.write("---")
+        st.subheader("Astrokartografi")
+        acg_mode = st.checkbox("Dünya hat haritası + yeniden konumlandırma", value=False)
+        acg_city = ""
+        if acg_mode:
+            acg_city = st.text_input("Yeniden konumlandırma şehri (boş = doğum yeri)", value="")
+
+        st.write("---")
+        st.subheader("Elektif Zaman Arama")
+        election_mode = st.checkbox("Uygun zaman pencerelerini ara", value=False)
+        election_start = date.today()
+        election_days = 30
+        election_moon_houses = [6, 8, 12]
+        election_malefic_orb = 2.0
+        election_benefic_orb = 3.0
+        if election_mode:
+            e1, e2 = st.columns(2)
+            election_start = e1.date_input("Arama başlangıcı", value=date.today())
+            election_days = e2.number_input("Kaç gün", value=30, min_value=1, max_value=730, step=1)
+            election_moon_houses = st.multiselect("Ay bu evlerde olmasın (seçim haritası)", options=list(range(1, 13)), default=[6, 8, 12])
+            o1, o2 = st.columns(2)
+            election_malefic_orb = o1.number_input("Satürn/Mars orb", value=2.0, min_value=0.5, max_value=8.0, step=0.5)
+            election_benefic_orb = o2.number_input("Venüs/Jüpiter orb", value=3.0, min_value=0.5, max_value=8.0, step=0.5)
+
         st.write("---")
         st.subheader("AI (Gemini)")
         if models_err:
@@ -684,11 +1943,52 @@ with st.sidebar:
             model_fullname = "models/gemini-2.5-flash"
         else:
             model_fullname = st.selectbox("Model", models, index=models.index(default_model) if default_model in models else 0)
+        hedge_mode = st.checkbox("Hedge modu (yavaş cevapta hızlı modele de sor)", value=False)
+        hedge_pct = 90
+        ai_deadline = 45
+        if hedge_mode:
+            hedge_pct = st.slider("Hedge gecikmesi (gecikme yüzdeliği)", min_value=50, max_value=99, value=90)
+            ai_deadline = st.number_input("Toplam AI süre sınırı (sn)", value=45, min_value=10, max_value=120, step=5)
+            st.caption("Süre sınırı aşılırsa kural tabanlı rapor gösterilir.")
 
         question = st.text_area("Sorunuz", value="Genel yorum")
         submitted = st.form_submit_button("Analiz Et ✨")
 
+    with st.expander("🗄️ Harita arşivi sorgusu"):
+        chart_store = get_chart_store()
+        q_planet = st.selectbox("Gezegen", ["(hepsi)"] + list(PLANET_MEANING.keys()))
+        q_sign = st.selectbox("Burç", ["(hepsi)"] + ZODIAC)
+        q_house = st.selectbox("Ev", ["(hepsi)"] + list(range(1, 13)))
+        q_asc = st.selectbox("ASC burcu", ["(hepsi)"] + ZODIAC)
+        if st.button("Sorgula"):
+            conds = []
+            if q_planet != "(hepsi)":
+                conds.append((q_planet, None if q_sign == "(hepsi)" else q_sign, None if q_house == "(hepsi)" else q_house))
+            rows = query_charts(chart_store, conds, asc_sign=None if q_asc == "(hepsi)" else q_asc)
+            st.caption(f"{len(rows)} kayıt")
+            for r in rows:
+                st.markdown(f"<div class='small-note'>{r[1]} UTC | {r[2]:.4f}, {r[3]:.4f} | ASC {r[4]} | {r[5]}/{r[6]}</div>", unsafe_allow_html=True)
+        if st.button("Kohort analizi (doğum on yılı)"):
+            c_signs, c_cols = cohort_from_store(chart_store)
+            if len(c_signs) == 0:
+                st.caption("Arşiv boş.")
+            else:
+                groups = cohort_aggregate(c_signs, build_points_config(False), {"onyıl": c_cols["onyıl"]})
+                st.dataframe(
+                    [{"Onyıl": grp.key[0], "N": grp.n, **{f"Baskın {k}": v for k, v in grp.dom_elem_hist.items()}} for grp in groups],
+                    width="stretch"
+                )
+                overall = cohort_aggregate(c_signs, build_points_config(False))[0]
+                st.caption("Ortalama puan (Nitelik x Element)")
+                st.dataframe(
+                    [{"Nitelik": q, **{e: round(float(overall.matrix_mean[i, j]), 2) for j, e in enumerate(ELEMENT_ORDER)}}
+                     for i, q in enumerate(QUALITY_ORDER)],
+                    width="stretch"
+                )
+
 if submitted:
+    stage_times = {"_t": time_mod.perf_counter()}
+
     # Geocode
     if use_city:
         lt, ln = city_to_latlon(city)
@@ -696,6 +1996,7 @@ if submitted:
             lat, lon = lt, ln
         else:
             st.warning("Şehirden koordinat bulunamadı; manuel koordinatlar kullanılacak.")
+    mark_stage(stage_times, "geocode")
 
     # Build UTC dt
     local_dt = datetime.combine(d_date, d_time)
@@ -708,12 +2009,14 @@ if submitted:
         tz_label = "Europe/Istanbul"
 
     # Natal
-    cusps, visual_data, placements, aspects_str, aspects_raw, elem_count, qual_count = compute_natal(utc_dt, lat, lon)
+    natal, natal_from_store = get_or_compute_natal(chart_store, utc_dt, lat, lon)
+    cusps, placements, aspects = natal.cusps, natal.placements, natal.aspects
 
     # ✅ Puanlı element/nitelik
     points_cfg = build_points_config(include_outer_as_1=include_outer)
     elem_scores, qual_scores, score_matrix, total_points, dom_elem, dom_qual = compute_element_quality_scored(placements, points_cfg)
     score_table_html, col_tot, row_tot, grand = render_score_table_html(score_matrix)
+    mark_stage(stage_times, "natal")
 
     # Transit
     transit_movement = []
@@ -743,8 +2046,89 @@ if submitted:
             transit_html += f"<div class='transit-box'>{line}</div>"
         if transit_hits_sorted:
             transit_html += "<h4>⚡ Transit–Natal Temaslar</h4>"
-            for s,t in transit_hits_sorted[:15]:
-                transit_html += f"<div class='transit-box'>{t}</div>"
+            for h in transit_hits_sorted[:15]:
+                transit_html += f"<div class='transit-box'>{h}</div>"
+
+        sky_idx = get_sky_index()
+        if sky_idx is not None:
+            sky_lines = sky_context_lines(sky_idx, tr_start_utc, tr_end_utc)
+            if sky_lines:
+                transit_html += "<h4>🌐 Gökyüzü Bağlamı</h4>"
+                for line in sky_lines[:40]:
+                    transit_html += f"<div class='aspect-box'>{line}</div>"
+        else:
+            transit_html += "<div class='small-note'>Gökyüzü olay indeksi yok (python sky_index.py ile bir kez oluşturun).</div>"
+
+    mark_stage(stage_times, "transit")
+
+    # Progresyon
+    progression_events = []
+    if progression_mode:
+        progression_events = compute_progressions(natal, utc_dt, lat, lon, years=int(prog_years))
+
+    # Dönüş haritaları
+    return_charts = []
+    return_first = None
+    if return_mode:
+        ret_lat, ret_lon = lat, lon
+        if return_city.strip():
+            rl, rn = city_to_latlon(return_city)
+            if rl is not None and rn is not None:
+                ret_lat, ret_lon = rl, rn
+            else:
+                st.warning("Dönüş konumu bulunamadı; doğum yeri kullanılacak.")
+        ret_start = datetime(int(return_start_year), 1, 1)
+        ret_end = datetime(int(return_start_year) + int(return_years), 1, 1)
+        return_charts, return_unconverged = compute_returns(
+            return_planet, natal, utc_dt, lat, lon, ret_start, ret_end, ret_lat, ret_lon, names=RETURN_TABLE_BODIES
+        )
+        if return_unconverged:
+            st.warning(f"{return_unconverged} dönüş anı yakınsamadığı için listeden çıkarıldı.")
+        if return_charts:
+            return_first = compute_natal(return_charts[0].utc, ret_lat, ret_lon)
+
+    # Rektifikasyon
+    rect_candidates = []
+    rect_events = []
+    if rect_mode:
+        rect_events = parse_life_events(rect_events_text)
+        rect_start_local = datetime.combine(d_date, rect_from)
+        rect_end_local = datetime.combine(d_date, rect_to)
+        if tz_mode == "manual_gmt":
+            rect_offset = int(utc_offset)
+        else:
+            tz = pytz.timezone("Europe/Istanbul")
+            rect_offset = tz.utcoffset(rect_start_local).total_seconds() / 3600.0
+        if rect_events and rect_end_local > rect_start_local:
+            rect_candidates = rectify_birth_time(rect_start_local, rect_end_local, rect_offset, lat, lon, rect_events)
+
+    # Astrokartografi
+    acg_names, acg_lines = [], None
+    reloc_natal = None
+    reloc_label, reloc_lat, reloc_lon = "Doğum yeri", lat, lon
+    if acg_mode:
+        acg_names, acg_lines = astrocartography_lines(
+            utc_dt, {p.planet: p.deg for p in placements if p.planet not in ("ASC","MC")}
+        )
+        if acg_city.strip():
+            rl, rn = city_to_latlon(acg_city)
+            if rl is not None and rn is not None:
+                reloc_label, reloc_lat, reloc_lon = acg_city.strip(), rl, rn
+            else:
+                st.warning("Yeniden konumlandırma şehri bulunamadı; doğum yeri kullanılacak.")
+        reloc_natal = compute_natal(utc_dt, reloc_lat, reloc_lon)
+
+    # Elektif arama (konum: doğum yeri)
+    election_windows = []
+    election_rules = []
+    if election_mode:
+        election_rules = build_election_rules(election_malefic_orb, election_moon_houses, election_benefic_orb)
+        el_start = datetime.combine(election_start, time(0, 0))
+        election_windows = election_search(
+            natal, lat, lon, el_start, el_start + timedelta(days=int(election_days)), election_rules
+        )
+
+    mark_stage(stage_times, "extras")
 
     # Build technical text for AI
     asc_sign = sign_name(cusps[1])
@@ -752,6 +2136,8 @@ if submitted:
 
     info_html = f"<div class='metric-box'>🌍 <b>UTC:</b> {utc_dt.strftime('%Y-%m-%d %H:%M')} <span class='small-note'>({tz_label})</span></div>"
     info_html += f"<div class='metric-box'>📍 <b>Koordinat:</b> {lat:.6f}, {lon:.6f} | <b>Ev Sistemi:</b> Placidus</div>"
+    if natal_from_store:
+        info_html += "<div class='metric-box'>🗄️ <b>Kayıt:</b> harita arşivden yüklendi <span class='small-note'>(yeniden hesaplanmadı)</span></div>"
     info_html += f"<div class='metric-box'>🚀 <b>ASC:</b> {asc_sign} {dec_to_dms(cusps[1]%30)} | <b>MC:</b> {mc_sign} {dec_to_dms(cusps[10]%30)}</div>"
 
     ai_data = f"Kişi: {name}\nŞehir: {city}\nUTC: {utc_dt.strftime('%Y-%m-%d %H:%M')} ({tz_label})\n"
@@ -759,11 +2145,11 @@ if submitted:
     ai_data += f"ASC: {asc_sign} {dec_to_dms(cusps[1]%30)}\nMC: {mc_sign} {dec_to_dms(cusps[10]%30)}\n\n"
 
     for p in placements:
-        if p["planet"] in ("ASC","MC"):
+        if p.planet in ("ASC","MC"):
             continue
-        ai_data += f"{p['planet']}: {p['sign']} {dec_to_dms(p['deg']%30)} ({p['house']}. Ev) | Tema: {HOUSE_TOPICS.get(p['house'])} | Anlam: {PLANET_MEANING.get(p['planet'],'')}\n"
+        ai_data += f"{p.planet}: {p.sign} {dec_to_dms(p.deg%30)} ({p.house}. Ev) | Tema: {HOUSE_TOPICS.get(p.house)} | Anlam: {PLANET_MEANING.get(p.planet,'')}\n"
 
-    ai_data += "\nAçılar:\n" + (", ".join(aspects_str) if aspects_str else "Zayıf/Yok") + "\n"
+    ai_data += "\nAçılar:\n" + (", ".join(map(str, aspects)) if aspects else "Zayıf/Yok") + "\n"
 
     # ✅ PUANLI element/nitelik AI verisine de ekleniyor
     ai_data += "\nElement (puan):\n" + ", ".join([f"{k}:{v}" for k,v in elem_scores.items()]) + "\n"
@@ -775,11 +2161,11 @@ if submitted:
         ai_data += "Hareket:\n" + "\n".join(transit_movement) + "\n"
         ai_data += "Ev bazlı:\n" + "\n".join(transit_house_themes) + "\n"
         if transit_hits_sorted:
-            ai_data += "Temaslar:\n" + "\n".join([t for s,t in transit_hits_sorted[:20]]) + "\n"
+            ai_data += "Temaslar:\n" + "\n".join(map(str, transit_hits_sorted[:20])) + "\n"
 
     # Rule based appendix / fallback (✅ puanlı)
     rule_text = rule_based_summary(
-        placements, aspects_raw,
+        placements, aspects,
         elem_scores, qual_scores,
         dom_elem, dom_qual,
         transit_hits_sorted=transit_hits_sorted if transit_mode else None,
@@ -808,10 +2194,20 @@ KURAL TABANLI EK (kontrol amaçlı):
 {rule_text}
 """.strip()
 
+    mark_stage(stage_times, "prompt")
+    latency_store = get_latency_store()
     with st.spinner("Yorum hazırlanıyor..."):
-        ai_reply = gemini_generate(prompt, model_fullname)
+        if hedge_mode:
+            hedge_model = pick_hedge_model(models, model_fullname)
+            ai_reply = gemini_generate_hedged(
+                prompt, model_fullname, hedge_model, latency_store,
+                hedge_pct=hedge_pct, deadline_s=int(ai_deadline)
+            )
+        else:
+            ai_reply = gemini_generate(prompt, model_fullname, latency_store=latency_store)
 
     ai_failed = ai_reply.startswith("AI Servis Hatası")
+    mark_stage(stage_times, "ai")
 
     if ai_failed:
         final_text = f"⚠️ AI erişim sorunu nedeniyle kural tabanlı rapor gösteriliyor.\n\n{rule_text}"
@@ -830,19 +2226,20 @@ KURAL TABANLI EK (kontrol amaçlı):
         "Element (puan): " + ", ".join([f"{k}:{v}" for k,v in elem_scores.items()]),
         "Nitelik (puan): " + ", ".join([f"{k}:{v}" for k,v in qual_scores.items()]),
         f"Baskın (puan): Element={dom_elem}, Nitelik={dom_qual} | Toplam={total_points}",
-        "Açılar: " + (", ".join(aspects_str[:12]) if aspects_str else "Zayıf/Yok"),
+        "Açılar: " + (", ".join(map(str, aspects[:12])) if aspects else "Zayıf/Yok"),
     ]
     if transit_mode:
         tech_lines.append(f"Transit dönemi: {start_date} - {end_date}")
         if transit_hits_sorted:
-            tech_lines.append("Öncelikli temaslar: " + " | ".join([t for s,t in transit_hits_sorted[:6]]))
+            tech_lines.append("Öncelikli temaslar: " + " | ".join(map(str, transit_hits_sorted[:6])))
 
     pdf_bytes = create_pdf_report(f"ASTRO RAPOR - {name}", meta_lines, final_text, tech_lines)
+    mark_stage(stage_times, "pdf")
 
     # =========================
     # OUTPUT TABS
     # =========================
-    tab1, tab2, tab3, tab4 = st.tabs(["📝 Yorum & Öngörü", "🗺️ Harita", "📊 Teknik Veriler", "📈 Element/Nitelik (Puanlı)"])
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs(["📝 Yorum & Öngörü", "🗺️ Harita", "📊 Teknik Veriler", "📈 Element/Nitelik (Puanlı)", "⏩ Progresyon", "🔁 Dönüşler", "🕰️ Rektifikasyon", "🌍 Astrokartografi", "🗓️ Elektif"])
 
     with tab1:
         if ai_failed:
@@ -854,7 +2251,7 @@ KURAL TABANLI EK (kontrol amaçlı):
             st.warning("PDF üretilemedi.")
 
     with tab2:
-        st.pyplot(draw_chart_visual(visual_data, cusps))
+        st.pyplot(draw_chart_visual(placements, cusps))
 
     with tab3:
         c1, c2 = st.columns(2)
@@ -862,17 +2259,17 @@ KURAL TABANLI EK (kontrol amaçlı):
             st.markdown("### 🪐 Natal Konumlar")
             st.markdown(info_html, unsafe_allow_html=True)
             for p in placements:
-                if p["planet"] in ("ASC","MC"):
+                if p.planet in ("ASC","MC"):
                     continue
-                idx = ZODIAC.index(p["sign"])
+                idx = ZODIAC.index(p.sign)
                 st.markdown(
-                    f"<div class='metric-box'><b>{p['planet']}</b>: {ZODIAC_SYMBOLS[idx]} {p['sign']} {dec_to_dms(p['deg']%30)} | <b>{p['house']}. Ev</b> <span class='small-note'>({HOUSE_TOPICS.get(p['house'])})</span></div>",
+                    f"<div class='metric-box'><b>{p.planet}</b>: {ZODIAC_SYMBOLS[idx]} {p.sign} {dec_to_dms(p.deg%30)} | <b>{p.house}. Ev</b> <span class='small-note'>({HOUSE_TOPICS.get(p.house)})</span></div>",
                     unsafe_allow_html=True
                 )
         with c2:
             st.markdown("### 📐 Açılar")
-            if aspects_str:
-                for a in aspects_str:
+            if aspects:
+                for a in aspects:
                     st.markdown(f"<div class='aspect-box'>{a}</div>", unsafe_allow_html=True)
             else:
                 st.info("Belirgin ana açı bulunamadı (orb dışında).")
@@ -907,3 +2304,128 @@ KURAL TABANLI EK (kontrol amaçlı):
             ax2.bar(list(qual_scores.keys()), list(qual_scores.values()))
             ax2.set_title("Nitelik (Puan)")
             st.pyplot(fig2)
+
+    with tab5:
+        st.markdown("### ⏩ İkincil Progresyon + Solar Ark")
+        if not progression_mode:
+            st.info("Zaman çizelgesi için soldan progresyon modunu açın.")
+        elif not progression_events:
+            st.info("Bu aralıkta progresif açı / burç / ev değişimi bulunamadı.")
+        else:
+            st.caption(f"Orb: {PROGRESSION_ORB}° | Açılar natal noktalara göre, orb'a giriş yaşı gösterilir (yıllık örnekler arası ara değer).")
+            for ev in progression_events:
+                st.markdown(f"<div class='aspect-box'>{ev}</div>", unsafe_allow_html=True)
+
+    with tab6:
+        st.markdown("### 🔁 Solar / Lunar Dönüşler")
+        if not return_mode:
+            st.info("Dönüş haritaları için soldan dönüş modunu açın.")
+        elif not return_charts:
+            st.info("Seçilen aralıkta dönüş bulunamadı.")
+        else:
+            st.caption(f"{len(return_charts)} dönüş | {return_planet} natal boylamına dönüş anları (UTC)")
+            rows = []
+            for rc in return_charts:
+                rcusps = rc.chart.cusps
+                sun = next(p for p in rc.chart.placements if p.planet == "Güneş")
+                moon = next(p for p in rc.chart.placements if p.planet == "Ay")
+                rows.append({
+                    "UTC": rc.utc.strftime("%Y-%m-%d %H:%M:%S"),
+                    "ASC": f"{sign_name(rcusps[1])} {dec_to_dms(rcusps[1]%30)}",
+                    "MC": f"{sign_name(rcusps[10])} {dec_to_dms(rcusps[10]%30)}",
+                    "Güneş evi": sun.house,
+                    "Ay evi": moon.house,
+                    "Güneş-Ay açısı": next((a.aspect for a in rc.chart.aspects), "-"),
+                })
+            st.dataframe(rows, width="stretch")
+
+            st.markdown(f"#### İlk dönüş: {return_charts[0].utc.strftime('%Y-%m-%d %H:%M')} UTC")
+            for p in return_first.placements:
+                st.markdown(
+                    f"<div class='metric-box'><b>{p.planet}</b>: {p.sign} {dec_to_dms(p.deg%30)} | <b>{p.house}. Ev</b> <span class='small-note'>({HOUSE_TOPICS.get(p.house)})</span></div>",
+                    unsafe_allow_html=True
+                )
+            for a in return_first.aspects:
+                st.markdown(f"<div class='aspect-box'>{a}</div>", unsafe_allow_html=True)
+
+    with tab7:
+        st.markdown("### 🕰️ Doğum Saati Düzeltme")
+        if not rect_mode:
+            st.info("Rektifikasyon için soldan modu açıp yaşam olaylarını girin.")
+        elif not rect_candidates:
+            st.info("Geçerli olay (YYYY-AA-GG) veya pencere bulunamadı.")
+        else:
+            st.caption(
+                f"{len(rect_events)} olay | transit temas orb {RECT_TRANSIT_ORB}°, solar ark orb {RECT_DIRECTION_ORB}° | "
+                f"ASC/MC: {', '.join(RECT_ASPECTS)}; ara cusp'lar: Kavuşum (x{RECT_CUSP_WEIGHT}) | en iyi {len(rect_candidates)} aday"
+            )
+            st.dataframe([
+                {
+                    "Yerel saat": c.local_dt.strftime("%H:%M"),
+                    "UTC": c.utc.strftime("%Y-%m-%d %H:%M"),
+                    "Puan": round(c.score, 2),
+                    "ASC": f"{sign_name(c.asc)} {dec_to_dms(c.asc%30)}",
+                    "MC": f"{sign_name(c.mc)} {dec_to_dms(c.mc%30)}",
+                }
+                for c in rect_candidates
+            ], width="stretch")
+
+    with tab8:
+        st.markdown("### 🌍 Astrokartografi")
+        if not acg_mode:
+            st.info("Hat haritası için soldan astrokartografi modunu açın.")
+        else:
+            marks = [("Doğum", float(lat), float(lon))]
+            if (reloc_lat, reloc_lon) != (lat, lon):
+                marks.append((reloc_label, float(reloc_lat), float(reloc_lon)))
+            st.image(render_astrocartography_png(tuple(acg_names), acg_lines, tuple(marks)), width="stretch")
+            st.caption("Düz çizgi: ASC (kalın) / MC (kalın) | kesik: DSC | noktalı: IC. Hatlar ±66° enlemde kesilir.")
+
+            st.markdown(f"#### {reloc_label}: en yakın hatlar")
+            st.dataframe([
+                {"Gezegen": n, "Açı": a, "Mesafe (km, yaklaşık)": round(km)}
+                for n, a, km in acg_nearest_lines(acg_names, acg_lines, reloc_lat, reloc_lon)
+            ], width="stretch")
+
+            st.markdown(f"#### {reloc_label}: yeniden konumlandırılmış evler")
+            natal_house = {p.planet: p.house for p in placements}
+            rcusps = reloc_natal.cusps
+            st.caption(
+                f"ASC {sign_name(rcusps[1])} {dec_to_dms(rcusps[1]%30)} | MC {sign_name(rcusps[10])} {dec_to_dms(rcusps[10]%30)}"
+            )
+            st.dataframe([
+                {
+                    "Gezegen": p.planet,
+                    "Burç": f"{p.sign} {dec_to_dms(p.deg%30)}",
+                    "Natal ev": natal_house.get(p.planet),
+                    "Yeni ev": p.house,
+                    "Yeni ev teması": HOUSE_TOPICS.get(p.house),
+                }
+                for p in reloc_natal.placements if p.planet not in ("ASC","MC")
+            ], width="stretch")
+
+    with tab9:
+        st.markdown("### 🗓️ Elektif Zaman Pencereleri")
+        if not election_mode:
+            st.info("Uygun zaman araması için soldan elektif modu açın.")
+        else:
+            st.caption(
+                f"{election_start} + {int(election_days)} gün | kurallar: " + "; ".join(r["name"] for r in election_rules)
+            )
+            if not election_windows:
+                st.info("Kuralların hepsini sağlayan pencere bulunamadı; orb veya ev kısıtlarını gevşetin.")
+            else:
+                st.dataframe([
+                    {
+                        "Başlangıç (UTC)": w.start.strftime("%Y-%m-%d %H:%M"),
+                        "Bitiş (UTC)": w.end.strftime("%Y-%m-%d %H:%M"),
+                        "Süre (dk)": w.minutes,
+                        "Puan": round(w.score, 2),
+                        "En iyi an (UTC)": w.best.strftime("%Y-%m-%d %H:%M"),
+                        "Destekleyen": ", ".join(w.notes) or "-",
+                    }
+                    for w in election_windows
+                ], width="stretch")
+
+    mark_stage(stage_times, "render")
+    write_stage_log(stage_times)
@@ -0,0 +1,277 @@
+# check_vectorized.py
+"""
+Vektör (numpy) yolların skaler referanslarla tutarlılık kontrolü.
+
+Natal, yeniden konumlandırma ve dönüşler skaler fonksiyonları kullanır
+(calculate_placidus_cusps, get_house_of_deg, compute_natal); rektifikasyon,
+astrokartografi, elektif arama ve toplu dönüş haritaları bunların vektör hallerini. Bu betik ikisinin ayrışmadığını doğrular.
+Progresyon zaman çizelgesi yıllık örnekten ara değerlendiği için sık örnekli referansla karşılaştırılır.
+
+app.py içe aktarılırken UI da çalışır (bare mode): Gemini model listesi için
+loadtest.py'nin sahte sunucusu açılır, secrets ve harita arşivi geçici dizine yazılır.
+
+Örnek:
+    python check_vectorized.py
+Çıkış kodu: tüm kontroller geçerse 0, aksi halde 1.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+from loadtest import start_fake_server   # noqa: E402
+
+def import_app():
+    cfg = argparse.Namespace(
+        geo_latency=0.0, geo_jitter=0.0, geo_error_rate=0.0,
+        gemini_latency=0.0, gemini_jitter=0.0, gemini_error_rate=0.0,
+    )
+    srv, fake_base = start_fake_server(cfg)
+    workdir = tempfile.mkdtemp(prefix="astro_check_")
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write('GOOGLE_API_KEY = "check"\n')
+    os.environ.update({
+        "ASTRO_GEN_API_BASE": fake_base,
+        "ASTRO_NOMINATIM_URL": f"{fake_base}/search",
+        "ASTRO_CHART_DB": os.path.join(workdir, "charts.sqlite"),
+    })
+    os.chdir(workdir)   # st.secrets çalışma dizinindeki .streamlit/secrets.toml'u okur
+    # bare mode "missing ScriptRunContext" uyarıları (config okunurken seviye yeniden kurulur)
+    from streamlit import config, logger
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+    import app
+    return app, srv
+
+def random_moment(rng):
+    return datetime(1900, 1, 1) + timedelta(minutes=rng.randint(0, 200 * 365 * 1440))
+
+def sidereal_deg(utc_dt, lat, lon):
+    import ephem
+    obs = ephem.Observer()
+    obs.lat, obs.lon = str(lat), str(lon)
+    obs.date = utc_dt.strftime("%Y/%m/%d %H:%M:%S")
+    return math.degrees(float(obs.sidereal_time()))
+
+# =========================
+# CHECKS -> (geçti_mi, açıklama)
+# =========================
+def check_placidus_cusps_vec(app, rng, n=2000):
+    """placidus_cusps_vec == calculate_placidus_cusps (12 cusp, rastgele an/konum, |enlem| <= 66)."""
+    worst = 0.0
+    for _ in range(n):
+        dt, lat, lon = random_moment(rng), rng.uniform(-66, 66), rng.uniform(-180, 180)
+        ref = app.calculate_placidus_cusps(dt, lat, lon)
+        vec = app.placidus_cusps_vec([sidereal_deg(dt, lat, lon)], lat)[0]
+        for h in range(1, 13):
+            worst = max(worst, abs(app._wrap180(vec[h - 1] - ref[h])))
+    return worst < 1e-9, f"{n} an, en büyük fark {worst:.2e}°"
+
+def check_house_lookup(app, rng, n=2000):
+    """houses_of_degs / houses_of_degs_rows == get_house_of_deg (cusp sınırları dahil)."""
+    cusps_list = [app.calculate_placidus_cusps(random_moment(rng), rng.uniform(-66, 66), rng.uniform(-180, 180)) for _ in range(n)]
+    degs = [rng.choice([rng.uniform(0, 360), c[rng.randint(1, 12)]]) for c in cusps_list]
+    ref = np.array([app.get_house_of_deg(d, c) for d, c in zip(degs, cusps_list)])
+    rows = app.houses_of_degs_rows(np.array(degs), np.array([[c[h] for h in range(1, 13)] for c in cusps_list]))
+    single = np.array([app.houses_of_degs([d], c)[0] for d, c in zip(degs, cusps_list)])
+    bad = int((rows != ref).sum() + (single != ref).sum())
+    return bad == 0, f"{n} derece (yarısı tam cusp üzerinde), uyuşmayan {bad}"
+
+def check_compute_natal_batch(app, rng, n=300):
+    """compute_natal_batch == compute_natal (burç, ev, açı listesi, element/nitelik sayımı; derece farkı)."""
+    lat, lon = rng.uniform(-66, 66), rng.uniform(-180, 180)
+    moments = [random_moment(rng) for _ in range(n)]
+    bad, worst = 0, 0.0
+    for dt, got in zip(moments, app.compute_natal_batch(moments, lat, lon)):
+        ref = app.compute_natal(dt, lat, lon)
+        same = (
+            [(p.planet, p.sign, p.house) for p in got.placements] == [(p.planet, p.sign, p.house) for p in ref.placements]
+            and [(a.p1, a.aspect, a.p2) for a in got.aspects] == [(a.p1, a.aspect, a.p2) for a in ref.aspects]
+            and got.elem_count == ref.elem_count and got.qual_count == ref.qual_count
+        )
+        bad += not same
+        worst = max([worst] + [abs(app._wrap180(a.deg - b.deg)) for a, b in zip(got.placements, ref.placements)])
+    return bad == 0 and worst < 1e-9, f"{n} harita, uyuşmayan {bad}, en büyük derece farkı {worst:.2e}°"
+
+def check_find_returns(app, rng, years=100, tol_deg=1e-4):
+    """find_returns kökleri: skaler Ecliptic boylamı natal boylamdan <= tol_deg, eksik/çift dönüş yok."""
+    import ephem
+    birth, lat, lon = datetime(1980, 11, 26, 13, 0), 41.0, 29.0
+    natal = app.compute_natal(birth, lat, lon)
+    obs = ephem.Observer()
+    obs.lat, obs.lon = str(lat), str(lon)
+    ok, details = True, []
+    for planet, body in app.RETURN_BODIES.items():
+        natal_deg = next(p.deg for p in natal.placements if p.planet == planet)
+        moments, unconverged = app.find_returns(
+            planet, natal_deg, birth, lat, lon, datetime(1981, 1, 1), datetime(1981 + years, 1, 1), tol_deg=tol_deg
+        )
+        b, worst = body(), 0.0
+        for m in moments:
+            obs.date = obs.epoch = ephem.Date(m)
+            b.compute(obs)
+            worst = max(worst, abs(app._wrap180(math.degrees(ephem.Ecliptic(b).lon) - natal_deg)))
+        gaps = np.diff([float(ephem.Date(m)) for m in moments]) / app.RETURN_PERIODS[planet]
+        ok &= unconverged == 0 and worst <= tol_deg and gaps.min() > 0.9 and gaps.max() < 1.1
+        details.append(f"{planet} {len(moments)} dönüş, yakınsamayan {unconverged}, en büyük sapma {worst:.1e}°")
+    return ok, "; ".join(details)
+
+PROGRESSION_CASES = [
+    # (doğum UTC, enlem, boylam, yıl)
+    (datetime(1980, 11, 26, 13, 0), 41.0, 29.0, 90),
+    (datetime(1962, 7, 9, 4, 15), 59.9, 10.7, 60),
+]
+PROGRESSION_REF_STEPS = 50   # referans: yılda 50 örnek
+
+def progression_reference(app, natal, utc_dt, lat, lon, years):
+    """Sık örneklenmiş progresyon: orb'a ilk giren / burcu, evi değişen örneğin yaşı (skaler ev bulma)."""
+    ages = np.arange(years * PROGRESSION_REF_STEPS + 1) / PROGRESSION_REF_STEPS
+    names, prog = app.ephemeris_longitudes([utc_dt + timedelta(days=float(a)) for a in ages], lat, lon)
+    arc = (prog[:, names.index("Güneş")] - prog[0, names.index("Güneş")]) % 360
+    sa = (np.array([p.deg for p in natal.placements])[None, :] + arc[:, None]) % 360
+    natal_names = [p.planet for p in natal.placements]
+    natal_degs = np.array([p.deg for p in natal.placements])
+    events = []
+    for method, pnames, pos in (("İkincil", names, prog), ("Solar ark", natal_names, sa)):
+        for asp, angle in app.ASPECT_ANGLES.items():
+            d = np.abs(pos[:, :, None] - natal_degs[None, None, :]) % 360
+            within = np.abs(np.minimum(d, 360 - d) - angle) <= app.PROGRESSION_ORB
+            for i, p, n in zip(*np.nonzero(within[1:] & ~within[:-1])):
+                if pnames[p] != natal_names[n]:
+                    events.append((method, pnames[p], "aspect", natal_names[n], asp, ages[i + 1]))
+        for p, pname in enumerate(pnames):
+            signs = [app.sign_name(x) for x in pos[:, p]]
+            houses = [app.get_house_of_deg(x, natal.cusps) for x in pos[:, p]]
+            for i in range(1, len(ages)):
+                if signs[i] != signs[i - 1]:
+                    events.append((method, pname, "sign", None, signs[i], ages[i]))
+                if houses[i] != houses[i - 1]:
+                    events.append((method, pname, "house", None, houses[i], ages[i]))
+    return events
+
+def check_progressions(app, rng, tol_years=0.1):
+    """compute_progressions olayları == yılda 50 örnekli referans (aynı olaylar, yaş farkı <= tol_years)."""
+    details, bad_total, worst = [], 0, 0.0
+    for birth, lat, lon, years in PROGRESSION_CASES:
+        natal = app.compute_natal(birth, lat, lon)
+        got, ref = {}, {}
+        for e in app.compute_progressions(natal, birth, lat, lon, years=years):
+            got.setdefault((e.method, e.planet, e.kind, e.target, e.value), []).append(e.age)
+        for *key, age in progression_reference(app, natal, birth, lat, lon, years):
+            ref.setdefault(tuple(key), []).append(age)
+        bad = 0
+        for key in set(got) | set(ref):
+            a, b = sorted(got.get(key, [])), sorted(ref.get(key, []))
+            if len(a) != len(b):
+                bad += abs(len(a) - len(b))
+                continue
+            diffs = [abs(x - y) for x, y in zip(a, b)]
+            worst = max([worst] + diffs)
+            bad += sum(d > tol_years for d in diffs)
+        bad_total += bad
+        details.append(f"{years} yıl, {sum(map(len, ref.values()))} olay, uyuşmayan {bad}")
+    # doğumda cusp üzerindeki noktalar (solar ark ASC/MC) 0. yaşta ev değiştirmemeli
+    at_birth = 0
+    for _ in range(200):
+        birth, lat, lon = random_moment(rng), rng.uniform(-66, 66), rng.uniform(-180, 180)
+        natal = app.compute_natal(birth, lat, lon)
+        at_birth += sum(e.age <= 1e-9 for e in app.compute_progressions(natal, birth, lat, lon, years=2))
+    bad_total += at_birth
+    details.append(f"200 rastgele harita, 0. yaşta olay {at_birth}")
+    return bad_total == 0, "; ".join(details) + f", en büyük yaş farkı {worst:.3f}"
+
+ELECTION_CASES = [
+    # (doğum UTC, enlem, boylam, arama başı, gün, kurallar; None = build_election_rules())
+    (datetime(1980, 11, 26, 13, 0), 41.0, 29.0, datetime(2027, 1, 25), 5, None),
+    (datetime(1975, 5, 3, 6, 30), 52.5, 13.4, datetime(2026, 3, 22), 4, [
+        {"name": "Ay üçgen/sekstil", "kind": "aspect", "mode": "require",
+         "bodies": ["Ay"], "aspects": ["Üçgen","Sekstil"], "orb": 4.0},
+        {"name": "Ay natal 12/1. evde değil", "kind": "moon_house", "mode": "forbid", "chart": "natal", "houses": [12, 1]},
+    ]),
+]
+
+def election_brute_force(app, natal, lat, lon, rules, start, minutes):
+    """Kuralların dakika dakika doğrudan değerlendirmesi (pyephem + skaler cusp/ev)."""
+    import ephem
+    obs = ephem.Observer()
+    obs.lat, obs.lon = str(lat), str(lon)
+    bodies = app.get_planet_objects()
+    ok = np.ones(minutes, dtype=bool)
+    for m in range(minutes):
+        dt = start + timedelta(minutes=m)
+        obs.date = dt.strftime("%Y/%m/%d %H:%M:%S")
+        obs.epoch = obs.date
+        lon_of = {}
+        for r in rules:
+            if r["mode"] == "prefer":
+                continue
+            names = r["bodies"] if r["kind"] == "aspect" else ["Ay"]
+            for b in names:
+                if b not in lon_of:
+                    bodies[b].compute(obs)
+                    lon_of[b] = math.degrees(ephem.Ecliptic(bodies[b]).lon) % 360
+            if r["kind"] == "aspect":
+                targets = [p.deg for p in natal.placements if r.get("targets") is None or p.planet in r["targets"]]
+                hit = any(
+                    abs(app.angle_diff(lon_of[b], t) - app.ASPECT_ANGLES[a]) <= r["orb"]
+                    for b in r["bodies"] for t in targets for a in r["aspects"]
+                )
+            else:
+                cusps = natal.cusps if r.get("chart", "election") == "natal" else app.calculate_placidus_cusps(dt, lat, lon)
+                hit = app.get_house_of_deg(lon_of["Ay"], cusps) in r["houses"]
+            ok[m] &= (not hit) if r["mode"] == "forbid" else hit
+    return ok
+
+def check_election_search(app, rng):
+    """election_search pencereleri == dakika dakika kaba kuvvet (zorunlu/yasak kurallar)."""
+    details, bad_total = [], 0
+    for birth, lat, lon, start, days, rules in ELECTION_CASES:
+        rules = rules or app.build_election_rules()
+        natal = app.compute_natal(birth, lat, lon)
+        minutes = days * 1440
+        windows = app.election_search(natal, lat, lon, start, start + timedelta(days=days), rules, min_len_min=1, top=10**9)
+        fast = np.zeros(minutes, dtype=bool)
+        for w in windows:
+            fast[int((w.start - start).total_seconds() // 60):int((w.end - start).total_seconds() // 60)] = True
+        ref = election_brute_force(app, natal, lat, lon, rules, start, minutes)
+        bad = int((fast != ref).sum())
+        bad_total += bad
+        details.append(f"{minutes} dk, uygun %{100 * ref.mean():.0f}, uyuşmayan {bad}")
+    return bad_total == 0, "; ".join(details)
+
+CHECKS = [
+    check_placidus_cusps_vec,
+    check_house_lookup,
+    check_compute_natal_batch,
+    check_find_returns,
+    check_progressions,
+    check_election_search,
+]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Vektör yolları skaler referanslarla karşılaştırır.")
+    ap.add_argument("--seed", type=int, default=0)
+    cfg = ap.parse_args(argv)
+
+    app, srv = import_app()
+    failed = 0
+    try:
+        for check in CHECKS:
+            ok, detail = check(app, random.Random(cfg.seed))
+            failed += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {check.__name__}: {detail}")
+    finally:
+        srv.shutdown()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
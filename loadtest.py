@@ -0,0 +1,349 @@
+# loadtest.py
+"""
+Eşzamanlı oturum yük testi: tek bir `streamlit run app.py` instance'ına N oturum açıp
+"Analiz Et" akışını (geocode -> natal -> transit -> AI -> PDF -> render) sürer.
+
+Gemini (models + generateContent) ve Nominatim yerine yerel sahte HTTP sunucusu
+açılır; gecikme ve hata oranı ayarlanabilir. app.py bu adreslere ortam
+değişkenleriyle yönlendirilir (ASTRO_GEN_API_BASE, ASTRO_NOMINATIM_URL); harita
+arşivi geçici dizine yazılır (ASTRO_CHART_DB).
+
+Oturumlar tarayıcı gibi /_stcore/stream websocket'ine bağlanır ve BackMsg/ForwardMsg
+protobuf mesajlarıyla script'i çalıştırır. Aşama süreleri app.py'nin
+ASTRO_STAGE_LOG dosyasından okunur.
+
+Rapor: throughput, uçtan uca ve aşama bazlı p50/p95/p99, hata sayıları ve
+sunucu sürecinin zaman içindeki RSS'i (Linux /proc).
+
+Gereken ek paket: websockets (>=11, sync client).
+
+Örnek:
+    python loadtest.py --sessions 200 --concurrency 16 --gemini-latency 1.5 --gemini-error-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+FAKE_MODELS = [
+    "models/gemini-2.5-flash",
+    "models/gemini-2.5-flash-lite",
+]
+
+SUBMIT_LABEL = "Analiz Et ✨"
+TRANSIT_LABEL = "Transit modu aç"
+
+# =========================
+# FAKE SERVERS (Gemini + Nominatim)
+# =========================
+def _delay(latency, jitter):
+    d = latency + random.uniform(-jitter, jitter)
+    if d > 0:
+        time.sleep(d)
+
+def make_handler(cfg):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, obj):
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path.endswith("/models"):
+                self._send(200, {"models": [
+                    {"name": m, "supportedGenerationMethods": ["generateContent"]} for m in FAKE_MODELS
+                ]})
+            elif path.endswith("/search"):
+                _delay(cfg.geo_latency, cfg.geo_jitter)
+                if random.random() < cfg.geo_error_rate:
+                    self._send(503, {"error": "fake nominatim error"})
+                else:
+                    # rastgele koordinat -> her oturum ayrı harita (arşiv isabeti değil gerçek hesap)
+                    self._send(200, [{"lat": f"{random.uniform(-60, 60):.6f}", "lon": f"{random.uniform(-180, 180):.6f}"}])
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(n)
+            if not urlparse(self.path).path.endswith(":generateContent"):
+                self._send(404, {"error": "not found"})
+                return
+            _delay(cfg.gemini_latency, cfg.gemini_jitter)
+            if random.random() < cfg.gemini_error_rate:
+                self._send(500, {"error": {"message": "fake gemini error"}})
+            else:
+                self._send(200, {"candidates": [{"content": {"parts": [{"text": "Sahte AI yorumu."}]}}]})
+
+    return Handler
+
+def start_fake_server(cfg):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(cfg))
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+# =========================
+# STREAMLIT SERVER
+# =========================
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_app(workdir, fake_base, stage_log, port, startup_timeout=60):
+    os.makedirs(os.path.join(workdir, ".streamlit"), exist_ok=True)
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write('GOOGLE_API_KEY = "loadtest"\n')
+
+    env = dict(os.environ)
+    env.update({
+        "ASTRO_GEN_API_BASE": fake_base,
+        "ASTRO_NOMINATIM_URL": f"{fake_base}/search",
+        "ASTRO_CHART_DB": os.path.join(workdir, "charts.sqlite"),
+        "ASTRO_STAGE_LOG": stage_log,
+    })
+    cmd = [
+        sys.executable, "-m", "streamlit", "run", APP_PATH,
+        "--server.headless", "true",
+        "--server.address", "127.0.0.1",
+        "--server.port", str(port),
+        "--server.enableXsrfProtection", "false",
+        "--server.enableCORS", "false",
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, "server.log"), "w"))
+
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit başlamadı (exit {proc.returncode}); bkz. {workdir}/server.log")
+        try:
+            with urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError("streamlit sağlık kontrolü zaman aşımı")
+
+# =========================
+# RSS SAMPLER (sunucu süreci)
+# =========================
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+def sample_rss(pid, samples, stop, t0, interval):
+    while not stop.is_set():
+        m = rss_mb(pid)
+        if m is not None:
+            samples.append((time.perf_counter() - t0, m))
+        stop.wait(interval)
+
+# =========================
+# SESSION DRIVER (websocket)
+# =========================
+def _rerun(ws, widgets=()):
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.widget_states.widgets.extend(widgets)
+    ws.send(msg.SerializeToString())
+
+def _run_until_finished(ws, timeout):
+    """Script bitene kadar ForwardMsg'leri okur -> (elementler, hata mesajları)."""
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    elements, errors = [], []
+    deadline = time.perf_counter() + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            raise TimeoutError("script_finished gelmedi")
+        fm = ForwardMsg()
+        fm.ParseFromString(ws.recv(timeout=remaining))
+        kind = fm.WhichOneof("type")
+        if kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+            el = fm.delta.new_element
+            elements.append(el)
+            if el.WhichOneof("type") == "exception":
+                errors.append(el.exception.message)
+        elif kind == "script_finished":
+            return elements, errors
+
+def _find_widget(elements, etype, label):
+    for el in elements:
+        if el.WhichOneof("type") == etype and getattr(el, etype).label == label:
+            return getattr(el, etype).id
+    return None
+
+def run_session(i, cfg, port):
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+    from websockets.sync.client import connect
+
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    try:
+        with connect(url, subprotocols=["streamlit"], max_size=None, open_timeout=cfg.timeout) as ws:
+            _rerun(ws)
+            elements, errors = _run_until_finished(ws, cfg.timeout)
+            if errors:
+                return {"ok": False, "error": f"load: {errors[0]}"}
+            submit_id = _find_widget(elements, "button", SUBMIT_LABEL)
+            if submit_id is None:
+                return {"ok": False, "error": "load: submit butonu bulunamadı"}
+
+            widgets = [WidgetState(id=submit_id, trigger_value=True)]
+            if cfg.transit:
+                cb_id = _find_widget(elements, "checkbox", TRANSIT_LABEL)
+                if cb_id is not None:
+                    widgets.append(WidgetState(id=cb_id, bool_value=True))
+
+            t0 = time.perf_counter()
+            _rerun(ws, widgets)
+            elements, errors = _run_until_finished(ws, cfg.timeout)
+            total = time.perf_counter() - t0
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    if errors:
+        return {"ok": False, "error": errors[0], "total": total}
+    ai_failed = any(
+        el.WhichOneof("type") == "markdown" and "AI erişim sorunu" in el.markdown.body
+        for el in elements
+    )
+    return {"ok": True, "total": total, "ai_failed": ai_failed}
+
+# =========================
+# REPORT
+# =========================
+def pct_line(name, values):
+    v = np.asarray(values)
+    return (f"{name:<10} n={len(v):<5} p50={np.percentile(v, 50)*1000:8.1f}ms "
+            f"p95={np.percentile(v, 95)*1000:8.1f}ms p99={np.percentile(v, 99)*1000:8.1f}ms "
+            f"max={v.max()*1000:8.1f}ms")
+
+def read_stage_log(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def build_report(results, stages, wall, rss):
+    ok = [r for r in results if r["ok"]]
+    lines = []
+    lines.append(f"Oturum: {len(results)} | başarılı: {len(ok)} | hata: {len(results) - len(ok)} "
+                 f"| AI fallback: {sum(r['ai_failed'] for r in ok)}")
+    lines.append(f"Süre: {wall:.2f}s | throughput: {len(ok) / wall:.2f} oturum/s")
+    if ok:
+        lines.append("")
+        lines.append(pct_line("total", [r["total"] for r in ok]))
+        stage_names = []
+        for st_ in stages:
+            for k in st_:
+                if k not in stage_names:
+                    stage_names.append(k)
+        for k in stage_names:
+            lines.append(pct_line(k, [st_[k] for st_ in stages if k in st_]))
+    errors = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+    if errors:
+        lines.append("")
+        lines.append("Hatalar:")
+        for e, c in sorted(errors.items(), key=lambda x: -x[1]):
+            lines.append(f"  {c}x {e[:200]}")
+    if rss:
+        vals = [m for _, m in rss]
+        lines.append("")
+        lines.append(f"RSS (sunucu): başlangıç={vals[0]:.1f}MB tepe={max(vals):.1f}MB son={vals[-1]:.1f}MB ({len(vals)} örnek)")
+        step = max(1, len(rss) // 10)
+        lines.append("  " + " | ".join(f"{t:.1f}s:{m:.0f}MB" for t, m in rss[::step]))
+    return "\n".join(lines)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="app.py eşzamanlı oturum yük testi (sahte Gemini/Nominatim).")
+    ap.add_argument("--sessions", type=int, default=50)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--transit", action="store_true", help="Transit modunu da aç")
+    ap.add_argument("--gemini-latency", type=float, default=1.0)
+    ap.add_argument("--gemini-jitter", type=float, default=0.3)
+    ap.add_argument("--gemini-error-rate", type=float, default=0.0)
+    ap.add_argument("--geo-latency", type=float, default=0.1)
+    ap.add_argument("--geo-jitter", type=float, default=0.05)
+    ap.add_argument("--geo-error-rate", type=float, default=0.0)
+    ap.add_argument("--timeout", type=float, default=120.0, help="Oturum başına zaman aşımı (sn)")
+    ap.add_argument("--rss-interval", type=float, default=0.5)
+    ap.add_argument("--port", type=int, default=0, help="0 = boş port seç")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="Ham sonuçları bu dosyaya yaz")
+    cfg = ap.parse_args(argv)
+    random.seed(cfg.seed)
+
+    srv, fake_base = start_fake_server(cfg)
+    workdir = tempfile.mkdtemp(prefix="astro_loadtest_")
+    stage_log = os.path.join(workdir, "stages.jsonl")
+    port = cfg.port or _free_port()
+    proc = start_app(workdir, fake_base, stage_log, port)
+
+    rss, stop = [], threading.Event()
+    t0 = time.perf_counter()
+    sampler = threading.Thread(target=sample_rss, args=(proc.pid, rss, stop, t0, cfg.rss_interval), daemon=True)
+    sampler.start()
+    try:
+        with ThreadPoolExecutor(max_workers=cfg.concurrency) as ex:
+            results = list(ex.map(lambda i: run_session(i, cfg, port), range(cfg.sessions)))
+    finally:
+        wall = time.perf_counter() - t0
+        stop.set()
+        sampler.join()
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        srv.shutdown()
+
+    stages = read_stage_log(stage_log)
+    print(build_report(results, stages, wall, rss))
+    print(f"\nÇalışma dizini: {workdir}")
+    if cfg.json:
+        with open(cfg.json, "w", encoding="utf-8") as f:
+            json.dump({"wall": wall, "results": results, "stages": stages, "rss": rss}, f, ensure_ascii=False, indent=1)
+    return 0 if all(r["ok"] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# sky_index.py
+"""
+Natal'den bağımsız gökyüzü olayları indeksi (mundane açılar, burç girişleri,
+retro/direkt istasyonları, yeni ay / dolunay).
+
+Tek seferlik kurulum (~1900-2100 taraması, birkaç on saniye):
+    python sky_index.py                  # varsayılan 1900-2100 -> sky_events.npy
+    python sky_index.py 1950 2050 out.npy
+
+Sorgular dosyayı (zamana göre sıralı numpy yapılandırılmış dizi) okur ve
+tarih aralığını ikili arama ile keser; sorgu anında efemeris çağrısı yoktur.
+"""
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SKY_INDEX_PATH = os.environ.get(
+    "ASTRO_SKY_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sky_events.npy")
+)
+
+# app.py (ZODIAC, PLANET isimleri) ile aynı; bu modül streamlit olmadan içe aktarılabilmeli
+ZODIAC = ["Koç","Boğa","İkizler","Yengeç","Aslan","Başak","Terazi","Akrep","Yay","Oğlak","Kova","Balık"]
+SKY_BODIES = ["Güneş","Merkür","Venüs","Mars","Jüpiter","Satürn","Uranüs","Neptün","Plüton"]
+# app.py ASPECT_ANGLES ile aynı sıra
+ASPECT_NAMES = ["Kavuşum","Sekstil","Kare","Üçgen","Karşıt"]
+# işaretli ayrım açısı (0..360) -> açı indeksi
+SIGNED_TARGETS = [(0, 0), (60, 1), (300, 1), (90, 2), (270, 2), (120, 3), (240, 3), (180, 4)]
+
+EV_ASPECT, EV_INGRESS, EV_STATION_R, EV_STATION_D, EV_NEW_MOON, EV_FULL_MOON = range(6)
+
+# t: ephem.Date günü (1899/12/31 12:00 UT'den beri), a/b: gövde, v: açı / burç indeksi
+EVENT_DTYPE = np.dtype([("t", "<f8"), ("kind", "u1"), ("a", "u1"), ("b", "u1"), ("v", "u1")])
+NO_BODY = 255
+
+EPHEM_EPOCH = datetime(1899, 12, 31, 12, 0, 0)
+J2000 = 36525.0   # ephem.Date('2000/1/1 12:00')
+
+# =========================
+# TIME HELPERS (ephem gerektirmez)
+# =========================
+def to_day(dt):
+    return (dt - EPHEM_EPOCH).total_seconds() / 86400.0
+
+def from_day(d):
+    return EPHEM_EPOCH + timedelta(days=float(d))
+
+# =========================
+# BUILD
+# =========================
+def sample_longitudes(d0, d1, step=1.0):
+    """Günlük ızgara üzerinde SKY_BODIES için geosantrik görünür ekliptik boylam (unwrap edilmiş)."""
+    import ephem
+
+    days = np.arange(d0, d1 + step, step)
+    bodies = [getattr(ephem, cls)() for cls in ("Sun","Mercury","Venus","Mars","Jupiter","Saturn","Uranus","Neptune","Pluto")]
+    ra = np.empty((len(days), len(bodies)))
+    dec = np.empty_like(ra)
+    for i, d in enumerate(days):
+        for j, b in enumerate(bodies):
+            b.compute(ephem.Date(d))
+            ra[i, j] = b.g_ra
+            dec[i, j] = b.g_dec
+    # tarihin ortalama eğikliği (yıl bazında ~0.5" hassasiyet yeterli)
+    eps = np.radians(23.439291 - 0.0130042 * (days - J2000) / 36525.0)[:, None]
+    lon = np.degrees(np.arctan2(np.sin(ra) * np.cos(eps) + np.tan(dec) * np.sin(eps), np.cos(ra))) % 360
+    return days, np.degrees(np.unwrap(np.radians(lon), axis=0))
+
+def _crossings(days, x, level, period):
+    """
+    x'in (level + k*period) seviyelerini kestiği anlar (lineer ara değer).
+    Dönüş: (zamanlar, kesişilen k, örnek indeksi i -> kesişim [i, i+1] arasında)
+    """
+    k = np.floor((x - level) / period)
+    i = np.nonzero(k[1:] != k[:-1])[0]
+    kk = np.maximum(k[i], k[i + 1])
+    target = level + kk * period
+    frac = (target - x[i]) / (x[i + 1] - x[i])
+    return days[i] + frac * (days[i + 1] - days[i]), kk, i
+
+def _events(n):
+    return np.zeros(n, dtype=EVENT_DTYPE)
+
+def find_sky_events(days, lon):
+    out = []
+    nb = lon.shape[1]
+
+    # burç girişleri (retro geri girişler dahil; v = girilen burç)
+    for j in range(nb):
+        t, k, i = _crossings(days, lon[:, j], 0.0, 30.0)
+        forward = lon[i + 1, j] > lon[i, j]
+        sign = np.where(forward, k, k - 1).astype(int) % 12
+        ev = _events(len(t))
+        ev["t"], ev["kind"], ev["a"], ev["b"], ev["v"] = t, EV_INGRESS, j, NO_BODY, sign
+        out.append(ev)
+
+    # istasyonlar: hız işaret değiştirir (Güneş hariç)
+    speed = np.diff(lon, axis=0)
+    mid = (days[1:] + days[:-1]) / 2
+    for j in range(1, nb):
+        s = speed[:, j]
+        i = np.nonzero(np.sign(s[1:]) != np.sign(s[:-1]))[0]
+        frac = s[i] / (s[i] - s[i + 1])
+        ev = _events(len(i))
+        ev["t"] = mid[i] + frac * (mid[i + 1] - mid[i])
+        ev["kind"] = np.where(s[i] > 0, EV_STATION_R, EV_STATION_D)
+        ev["a"], ev["b"], ev["v"] = j, NO_BODY, 0
+        out.append(ev)
+
+    # mundane açılar: her çift için işaretli ayrımın hedef açıları kesmesi
+    for a in range(nb):
+        for b in range(a + 1, nb):
+            sep = lon[:, a] - lon[:, b]
+            for target, asp in SIGNED_TARGETS:
+                t, _, _ = _crossings(days, sep, float(target), 360.0)
+                ev = _events(len(t))
+                ev["t"], ev["kind"], ev["a"], ev["b"], ev["v"] = t, EV_ASPECT, a, b, asp
+                out.append(ev)
+
+    return np.concatenate(out)
+
+def find_lunations(d0, d1):
+    import ephem
+
+    out = []
+    for kind, nxt in ((EV_NEW_MOON, ephem.next_new_moon), (EV_FULL_MOON, ephem.next_full_moon)):
+        d = d0
+        moon = ephem.Moon()
+        rows = []
+        while True:
+            d = float(nxt(d))
+            if d > d1:
+                break
+            moon.compute(d, epoch=d)
+            lon = math.degrees(ephem.Ecliptic(moon).lon) % 360
+            rows.append((d, kind, NO_BODY, NO_BODY, int(lon // 30) % 12))   # v = Ay'ın burcu
+            d += 1.0
+        out.append(np.array(rows, dtype=EVENT_DTYPE))
+    return np.concatenate(out)
+
+def build_sky_index(year0=1900, year1=2100, path=SKY_INDEX_PATH, step=1.0):
+    d0 = to_day(datetime(year0, 1, 1))
+    d1 = to_day(datetime(year1, 12, 31))
+    days, lon = sample_longitudes(d0, d1, step)
+    events = np.concatenate([find_sky_events(days, lon), find_lunations(d0, d1)])
+    events = events[(events["t"] >= d0) & (events["t"] <= d1)]
+    events.sort(order="t", kind="stable")
+    np.save(path, events)
+    return events
+
+# =========================
+# QUERY
+# =========================
+def load_sky_index(path=SKY_INDEX_PATH):
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r")
+
+def query_events(index, start, end, kinds=None, bodies=None):
+    """
+    [start, end) aralığındaki olaylar (ikili arama + maske).
+    kinds: EV_* kümesi; bodies: gövde adları (açılarda iki gövde de listede olmalı).
+    """
+    lo, hi = np.searchsorted(index["t"], [to_day(start), to_day(end)])
+    ev = np.asarray(index[lo:hi])
+    if kinds is not None:
+        ev = ev[np.isin(ev["kind"], list(kinds))]
+    if bodies is not None:
+        ids = [SKY_BODIES.index(b) for b in bodies]
+        ok_a = np.isin(ev["a"], ids)
+        ok_b = (ev["b"] == NO_BODY) | np.isin(ev["b"], ids)
+        lunation = np.isin(ev["kind"], [EV_NEW_MOON, EV_FULL_MOON])
+        ev = ev[lunation | (ok_a & ok_b)]
+    return ev
+
+def retrograde_periods(index, body, start, end):
+    """(retro başlangıcı, direkt dönüş) datetime çiftleri; aralıkla kesişen dönemler."""
+    j = SKY_BODIES.index(body)
+    # en uzun retro ~160 gün: aralığı o kadar genişletip ikili aramayla kes
+    lo, hi = np.searchsorted(index["t"], [to_day(start) - 200, to_day(end) + 200])
+    ev = np.asarray(index[lo:hi])
+    st = ev[np.isin(ev["kind"], [EV_STATION_R, EV_STATION_D]) & (ev["a"] == j)]
+    periods = []
+    for i in range(len(st) - 1):
+        if st["kind"][i] == EV_STATION_R and st["kind"][i + 1] == EV_STATION_D:
+            r, d = from_day(st["t"][i]), from_day(st["t"][i + 1])
+            if r < end and d > start:
+                periods.append((r, d))
+    return periods
+
+def format_event(ev):
+    when = from_day(ev["t"]).strftime("%Y-%m-%d %H:%M")
+    kind = int(ev["kind"])
+    if kind == EV_ASPECT:
+        return f"{when} | {SKY_BODIES[ev['a']]} {ASPECT_NAMES[ev['v']]} {SKY_BODIES[ev['b']]}"
+    if kind == EV_INGRESS:
+        return f"{when} | {SKY_BODIES[ev['a']]} → {ZODIAC[ev['v']]}"
+    if kind == EV_STATION_R:
+        return f"{when} | {SKY_BODIES[ev['a']]} retro başlar"
+    if kind == EV_STATION_D:
+        return f"{when} | {SKY_BODIES[ev['a']]} direkt döner"
+    if kind == EV_NEW_MOON:
+        return f"{when} | Yeni Ay ({ZODIAC[ev['v']]})"
+    return f"{when} | Dolunay ({ZODIAC[ev['v']]})"
+
+if __name__ == "__main__":
+    y0 = int(sys.argv[1]) if len(sys.argv) > 1 else 1900
+    y1 = int(sys.argv[2]) if len(sys.argv) > 2 else 2100
+    out = sys.argv[3] if len(sys.argv) > 3 else SKY_INDEX_PATH
+    t0 = time.time()
+    ev = build_sky_index(y0, y1, out)
+    print(f"{len(ev)} olay -> {out} ({os.path.getsize(out) / 1024:.0f} KB, {time.time() - t0:.1f}s)")